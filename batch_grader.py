@@ -0,0 +1,186 @@
+"""
+Micro-batched LLM grading.
+
+When a classroom answers at once, N independent chat calls queue up serially
+on one local Ollama instance. BatchGrader collects grading requests for a
+short window (or until `max_batch` are waiting), sends them as one numbered
+prompt with structured yes/no output, and hands each verdict back to its
+waiting caller. If the batched reply can't be parsed, the items are graded
+one by one instead, as long as their callers' deadlines allow it.
+"""
+
+import collections
+import json
+import queue
+import threading
+import time
+
+BATCH_PROMPT = (
+    "For each numbered item below, decide whether the answer is similar in meaning to the definition.\n"
+    "{items}\n"
+    "Respond with JSON of the form {{\"verdicts\": [\"yes\" or \"no\", ...]}} containing exactly "
+    "{count} verdicts, in item order."
+)
+
+
+def build_batch_prompt(pairs):
+    """Numbered multi-item grading prompt for [(answer, definition), ...]."""
+    items = "\n".join(f"{i}. Definition: {definition}\n   Answer: {answer}"
+                      for i, (answer, definition) in enumerate(pairs, 1))
+    return BATCH_PROMPT.format(items=items, count=len(pairs))
+
+
+def batch_schema(count):
+    """JSON schema constraining the reply to exactly `count` yes/no verdicts."""
+    return {
+        'type': 'object',
+        'properties': {
+            'verdicts': {
+                'type': 'array',
+                'items': {'type': 'string', 'enum': ['yes', 'no']},
+                'minItems': count,
+                'maxItems': count,
+            },
+        },
+        'required': ['verdicts'],
+    }
+
+
+def parse_verdicts(content, count):
+    """Parse a batched reply into a list of booleans, or None if it is malformed."""
+    try:
+        verdicts = json.loads(content)['verdicts']
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(verdicts, list) or len(verdicts) != count:
+        return None
+    parsed = []
+    for verdict in verdicts:
+        verdict = str(verdict).strip().lower()
+        if verdict not in ('yes', 'no'):
+            return None
+        parsed.append(verdict == 'yes')
+    return parsed
+
+
+class _Item:
+    __slots__ = ('answer', 'definition', 'model', 'deadline', 'verdict', 'done')
+
+    def __init__(self, answer, definition, model, deadline):
+        self.answer = answer
+        self.definition = definition
+        self.model = model
+        self.deadline = deadline  # time.monotonic() value, or None for no limit
+        self.verdict = None
+        self.done = threading.Event()
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+class BatchGrader:
+    """Coalesces concurrent grade() calls into batched chat requests.
+
+    `chat(model, prompt, schema)` returns the reply text of one structured
+    chat call; `single(answer, definition, model, deadline)` grades one item
+    and is used for lone requests and as the fallback when parsing fails.
+    Both return verdicts as True/False, or None if the model could not be
+    asked. Items whose deadline has passed are not sent to the model again.
+    """
+
+    def __init__(self, chat, single, window=0.03, max_batch=8):
+        self._chat = chat
+        self._single = single
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.batch_sizes = collections.Counter()
+        self._thread = threading.Thread(target=self._run, name='grading-batcher', daemon=True)
+        self._thread.start()
+
+    def grade(self, answer, definition, model, deadline=None):
+        """Block until this answer has been graded as part of a batch, or until `deadline` (time.monotonic()).
+
+        Returns None if the deadline passes first.
+        """
+        item = _Item(answer, definition, model, deadline)
+        self._queue.put(item)
+        if not item.done.wait(None if deadline is None else max(0.0, deadline - time.monotonic())):
+            with self._lock:
+                self.counts['timed_out'] += 1
+            return None
+        return item.verdict
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            by_model = collections.defaultdict(list)
+            for item in batch:
+                by_model[item.model].append(item)
+            for model, items in by_model.items():
+                try:
+                    self._grade_batch(model, items)
+                except Exception:
+                    pass
+                finally:
+                    for item in items:
+                        item.done.set()
+
+    def _grade_batch(self, model, items):
+        items = [item for item in items if not item.expired()]  # Their callers have given up already
+        if not items:
+            return
+        with self._lock:
+            self.batch_sizes[len(items)] += 1
+        if len(items) > 1:
+            try:
+                content = self._chat(model, build_batch_prompt([(i.answer, i.definition) for i in items]),
+                                     batch_schema(len(items)))
+                verdicts = parse_verdicts(content, len(items))
+            except Exception:
+                verdicts = None
+            if verdicts is not None:
+                for item, verdict in zip(items, verdicts):
+                    item.verdict = verdict
+                with self._lock:
+                    self.counts['batched_items'] += len(items)
+                return
+            with self._lock:
+                self.counts['parse_failures'] += 1
+        for item in items:
+            if item.expired():
+                # Out of time: the caller falls back to the offline verdict
+                with self._lock:
+                    self.counts['expired_items'] += 1
+                continue
+            item.verdict = self._single(item.answer, item.definition, model, item.deadline)
+            with self._lock:
+                self.counts['single_items'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'window_ms': self.window * 1000,
+                'max_batch': self.max_batch,
+                'batched_items': self.counts['batched_items'],
+                'single_items': self.counts['single_items'],
+                'parse_failures': self.counts['parse_failures'],
+                'expired_items': self.counts['expired_items'],
+                'timed_out': self.counts['timed_out'],
+                'batch_sizes': dict(sorted(self.batch_sizes.items())),
+            }
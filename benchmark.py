@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for Word Quest internals.
+
+Usage:
+    python3 benchmark.py scores [--sizes 10,1000,100000] [--answers 200]
+    python3 benchmark.py concurrency [--threads 300] [--answers 200] [--players 50]
+    python3 benchmark.py batching [--batch-sizes 1,2,4,8,16] [--clients 32] [--model mistral]
+    python3 benchmark.py distractors [--sizes 200,10000,100000]
+    python3 benchmark.py scheduler [--sizes 200,10000,200000] [--questions 200]
+    python3 benchmark.py math [--questions 20000] [--grades 2,5,12] [--seed 0]
+    python3 benchmark.py math-batch [--count 100000] [--grades 2,5,12] [--repeat 3] [--seed 0]
+    python3 benchmark.py downloads [--breeds 6] [--images 4] [--workers 8]
+
+Each subcommand builds synthetic data in a temporary directory, so it never
+touches the real scores or assets. The batching benchmark simulates a model
+server (fixed cost per call plus a cost per item, one call at a time) unless
+--model names a real Ollama model. The downloads benchmark runs the cat image
+downloader against a local stand-in server that fails some requests.
+"""
+
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import statistics
+import tempfile
+import threading
+import time
+from fractions import Fraction
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import numpy as np
+except ImportError:  # Optional; only the math-batch benchmark needs it
+    np = None
+
+from batch_grader import BatchGrader, batch_schema, build_batch_prompt, parse_verdicts
+from distractors import DistractorIndex
+from math_questions import VECTOR_MIN, generate_math_question, generate_math_questions, normalize_value
+from score_store import CachedScoreStore, JournalScoreStore, JsonScoreStore, SqliteScoreStore, _sort_weakest
+from word_scheduler import WordScheduler
+
+WORDS_PER_PLAYER = 20
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _report(label, samples):
+    """Print p50/p99/mean of a list of durations in seconds as milliseconds."""
+    print(f"  {label:<28} n={len(samples):<6} "
+          f"p50={_percentile(samples, 50) * 1000:9.3f}ms  "
+          f"p99={_percentile(samples, 99) * 1000:9.3f}ms  "
+          f"mean={statistics.mean(samples) * 1000:9.3f}ms")
+
+
+def _synthetic_scores(num_players, words_per_player=WORDS_PER_PLAYER):
+    """Build a scores.json style dict with `num_players` players."""
+    data = {'word_scores': {}, 'math_scores': {}}
+    for i in range(num_players):
+        player = f"player{i}"
+        data[player] = random.randint(0, 500)
+        data['math_scores'][player] = random.randint(0, 500)
+        data['word_scores'][player] = {f"word{j}": random.randint(0, 12) for j in range(words_per_player)}
+    return data
+
+
+def _time_answers(store, num_players, answers):
+    samples = []
+    for _ in range(answers):
+        player = f"player{random.randrange(num_players)}"
+        word = f"word{random.randrange(WORDS_PER_PLAYER)}"
+        start = time.perf_counter()
+        store.add_word_points(player, word, 3)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_scores(args):
+    """Per-answer latency of the JSON whole-file store vs the SQLite store."""
+    sizes = [int(s) for s in args.sizes.split(',')]
+    for num_players in sizes:
+        print(f"\n{num_players} players x {WORDS_PER_PLAYER} words")
+        data = _synthetic_scores(num_players)
+        with tempfile.TemporaryDirectory() as tmp:
+            json_store = JsonScoreStore(os.path.join(tmp, 'scores.json'))
+            json_store._save(data)
+            # The JSON path is O(total state) per answer, so keep large runs short
+            json_answers = args.answers if num_players <= 1000 else max(5, args.answers // 20)
+            _report('json (load + rewrite)', _time_answers(json_store, num_players, json_answers))
+
+            sqlite_store = SqliteScoreStore(os.path.join(tmp, 'scores.db'))
+            sqlite_store.import_data(data)
+            _report('sqlite (WAL upsert)', _time_answers(sqlite_store, num_players, args.answers))
+            sqlite_store.close()
+
+
+class _NullBackend:
+    """Backend that persists nothing, so only the in-memory locking is measured."""
+
+    def __init__(self, data=None):
+        self.data = data or {}
+
+    def export(self):
+        return self.data
+
+    def write_batch(self, totals, word_rows, review_rows=(), schedule_rows=()):
+        pass
+
+    def close(self):
+        pass
+
+
+def _hammer(store, num_threads, answers_per_thread, num_players):
+    """Run concurrent answers against `store`. Returns (seconds, lost points)."""
+    plans = []
+    expected = {}
+    for thread_index in range(num_threads):
+        rng = random.Random(thread_index)
+        plan = []
+        for i in range(answers_per_thread):
+            player = f"player{rng.randrange(num_players)}"
+            if i % 3 == 2:
+                plan.append((player, 'math', 3, None))
+                expected[(player, 'math')] = expected.get((player, 'math'), 0) + 3
+            else:
+                plan.append((player, 'mc', 1, f"word{rng.randrange(WORDS_PER_PLAYER)}"))
+                expected[(player, 'words')] = expected.get((player, 'words'), 0) + 1
+        plans.append(plan)
+
+    barrier = threading.Barrier(num_threads + 1)
+
+    def worker(plan):
+        barrier.wait()
+        for player, kind, points, word in plan:
+            store.record_answer(player, kind, points, word)
+
+    threads = [threading.Thread(target=worker, args=(plan,)) for plan in plans]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    lost = sum(points - store.get_score(player, game_type)
+               for (player, game_type), points in expected.items())
+    return elapsed, lost
+
+
+def bench_concurrency(args):
+    """Stress test for lost updates plus throughput of one global lock vs per-player striping."""
+    total_answers = args.threads * args.answers
+    print(f"{args.threads} threads x {args.answers} answers over {args.players} players")
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = [
+            ('memory, 1 global lock', lambda: CachedScoreStore(_NullBackend(), 3600, stripes=1)),
+            ('memory, 64 stripes', lambda: CachedScoreStore(_NullBackend(), 3600, stripes=64)),
+            ('journal, 64 stripes', lambda: JournalScoreStore(
+                os.path.join(tmp, 'snapshot.json'), os.path.join(tmp, 'scores.journal'))),
+            ('sqlite, write-through', lambda: SqliteScoreStore(os.path.join(tmp, 'scores.db'))),
+        ]
+        failed = False
+        for label, make_store in stores:
+            store = make_store()
+            elapsed, lost = _hammer(store, args.threads, args.answers, args.players)
+            store.close()
+            failed = failed or lost != 0
+            print(f"  {label:<24} {total_answers / elapsed:10.0f} answers/s  lost points: {lost}")
+    if failed:
+        raise SystemExit("FAIL: lost updates detected")
+
+
+def _simulated_chat(fixed_ms, per_item_ms):
+    """Stand-in for one local Ollama server: requests are served one at a time."""
+    server = threading.Lock()
+
+    def chat(model, prompt, schema):
+        count = schema['properties']['verdicts']['minItems']
+        with server:
+            time.sleep((fixed_ms + per_item_ms * count) / 1000)
+        return json.dumps({'verdicts': ['yes'] * count})
+    return chat
+
+
+def _grading_pairs(count):
+    with open('words.json') as f:
+        definitions = [w['definition'] for w in json.load(f)]
+    rng = random.Random(0)
+    return [(' '.join(rng.sample(d.split(), max(1, len(d.split()) // 2))), d)
+            for d in (rng.choice(definitions) for _ in range(count))]
+
+
+def bench_batching(args):
+    """Grading throughput and latency against batch size with many concurrent answers."""
+    if args.model:
+        from ollama_service import chat_content
+        chat = lambda model, prompt, schema: chat_content(model, prompt, format=schema)
+        print(f"model {args.model}, {args.clients} concurrent clients x {args.rounds} answers")
+    else:
+        chat = _simulated_chat(args.fixed_ms, args.per_item_ms)
+        print(f"simulated model ({args.fixed_ms}ms per call + {args.per_item_ms}ms per item), "
+              f"{args.clients} concurrent clients x {args.rounds} answers")
+
+    def single(answer, definition, model, deadline=None):
+        verdicts = parse_verdicts(chat(model, build_batch_prompt([(answer, definition)]), batch_schema(1)), 1)
+        return verdicts[0] if verdicts else None
+
+    pairs = _grading_pairs(args.clients * args.rounds)
+    for batch_size in [int(n) for n in args.batch_sizes.split(',')]:
+        grader = BatchGrader(chat, single, args.window_ms / 1000, batch_size)
+        latencies = []
+        barrier = threading.Barrier(args.clients + 1)
+
+        def client(offset):
+            barrier.wait()
+            for answer, definition in pairs[offset::args.clients]:
+                start = time.perf_counter()
+                grader.grade(answer, definition, args.model)
+                latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stats = grader.stats()
+        print(f"  batch {batch_size:<3} {len(pairs) / elapsed:8.1f} answers/s  "
+              f"p50={_percentile(latencies, 50) * 1000:8.1f}ms  p99={_percentile(latencies, 99) * 1000:8.1f}ms  "
+              f"parse failures: {stats['parse_failures']}")
+
+
+def _synthetic_definitions(count, seed=0):
+    """Unique fake definitions assembled from the vocabulary of words.json."""
+    with open('words.json') as f:
+        vocabulary = sorted({token for w in json.load(f) for token in w['definition'].split()})
+    rng = random.Random(seed)
+    definitions = {}
+    while len(definitions) < count:
+        definitions[' '.join(rng.sample(vocabulary, rng.randint(2, 7)))] = None
+    return list(definitions)
+
+
+def bench_distractors(args):
+    """Distractor index build time and option lookup vs the old per-miss scan of the deck."""
+    for size in [int(n) for n in args.sizes.split(',')]:
+        definitions = _synthetic_definitions(size)
+        deck = [{'word': f'word{i}', 'definition': d} for i, d in enumerate(definitions)]
+        start = time.perf_counter()
+        index = DistractorIndex(definitions)
+        build = time.perf_counter() - start
+        print(f"{size} definitions: index built in {build:.2f}s ({index.source})")
+        targets = [random.choice(definitions) for _ in range(args.lookups)]
+        samples = []
+        for correct_def in targets:
+            start = time.perf_counter()
+            all_defs = [w['definition'] for w in deck if w['definition'] != correct_def]
+            random.sample(all_defs, k=min(3, len(all_defs)))
+            samples.append(time.perf_counter() - start)
+        _report('scan + random.sample', samples)
+        samples = []
+        for correct_def in targets:
+            start = time.perf_counter()
+            index.options(correct_def)
+            samples.append(time.perf_counter() - start)
+        _report('index lookup', samples)
+
+
+def bench_scheduler(args):
+    """Next-word selection: full sort of the deck per question vs the incremental heaps."""
+    for size in [int(n) for n in args.sizes.split(',')]:
+        rng = random.Random(size)
+        deck = [{'word': f'word{i}', 'definition': f'definition {i}'} for i in range(size)]
+        # Half the deck has been answered before
+        scores = {f'word{i}': rng.randint(0, 9) for i in rng.sample(range(size), size // 2)}
+        answers = [(rng.choice(deck)['word'], rng.choice([0, 1, 3])) for _ in range(args.questions)]
+        print(f"{size} words:")
+
+        samples = []
+        sort_scores = dict(scores)
+        for word, points in answers:
+            start = time.perf_counter()
+            _sort_weakest(deck, sort_scores, 10)
+            samples.append(time.perf_counter() - start)
+            sort_scores[word] = sort_scores.get(word, 0) + points
+        _report('sort whole deck', samples)
+
+        store = CachedScoreStore(_NullBackend({'word_scores': {'player': scores}}), 3600)
+        scheduler = WordScheduler(deck, store)
+        start = time.perf_counter()
+        scheduler.weakest('player')
+        print(f"  {'heap build (once per player)':<28} {(time.perf_counter() - start) * 1000:9.3f}ms")
+        samples = []
+        for word, points in answers:
+            start = time.perf_counter()
+            scheduler.weakest('player')
+            scheduler.record('player', word, points)
+            samples.append(time.perf_counter() - start)
+        _report('heap select + update', samples)
+        store.close()
+
+        # Leitner, for a player who has worked through the deck: every word answered, nine in
+        # ten sitting in a box that isn't due yet. Time stands still, so nothing comes due and
+        # every pick goes through the weakest words
+        now = time.time()
+        boxed = rng.sample(range(size), size * 9 // 10)
+        store = CachedScoreStore(_NullBackend({
+            'word_scores': {'player': {word_info['word']: rng.randint(0, 9) for word_info in deck}},
+            'reviews': {'player': {f'word{i}': [rng.randint(0, 7), now + rng.randint(3600, 86400)] for i in boxed}},
+            'schedules': {'player': 'leitner'},
+        }), 3600)
+        scheduler = WordScheduler(deck, store)
+        scheduler.upcoming('player', now=now, rng=rng)
+        outcomes = {3: 'correct', 1: 'partial', 0: 'wrong'}
+        samples = []
+        for _, points in answers:
+            start = time.perf_counter()
+            word = scheduler.upcoming('player', now=now, rng=rng)[0]['word']
+            scheduler.record('player', word, points, outcomes[points], now=now)
+            samples.append(time.perf_counter() - start)
+        _report('leitner select + update', samples)
+        store.close()
+
+
+def _check_questions(questions):
+    """Count questions whose options aren't four distinct values containing the answer."""
+    return sum(1 for q in questions
+               if len(q['options']) != 4 or len({normalize_value(o) for o in q['options']}) != 4
+               or q['options'][q['correct_index']] != q['correct_answer'])
+
+
+_ARITHMETIC = re.compile(r"(\d+) ([-+×]) (\d+) = \?$")
+_FRACTION_SUM = re.compile(r"(\d+)/(\d+) \+ (\d+)/(\d+) = \?$")
+_LINEAR = re.compile(r"If (\d+)x \+ (\d+) = (\d+), what is x\?$")
+_POWER = re.compile(r"(\d+)(²|³|\^(\d+))$")
+_ROOT = re.compile(r"√(\d+) = \?$")
+
+
+def _solve(question):
+    """Work out the answer to a generated question independently of the generator, as a Fraction."""
+    match = _ARITHMETIC.match(question)
+    if match:
+        a, op, b = int(match[1]), match[2], int(match[3])
+        return Fraction({'+': a + b, '-': a - b, '×': a * b}[op])
+    match = _FRACTION_SUM.match(question)
+    if match:
+        return Fraction(int(match[1]), int(match[2])) + Fraction(int(match[3]), int(match[4]))
+    match = _LINEAR.match(question)
+    if match:
+        return Fraction(int(match[3]) - int(match[2]), int(match[1]))
+    match = _POWER.match(question)
+    if match:
+        return Fraction(int(match[1]) ** {'²': 2, '³': 3}.get(match[2], int(match[3] or 0)))
+    match = _ROOT.match(question)
+    return Fraction(int(round(int(match[1]) ** 0.5)))
+
+
+def bench_math(args):
+    """Per-question math generation latency, distinct option counts and answer correctness."""
+    for grade in [int(g) for g in args.grades.split(',')]:
+        random.seed(args.seed)
+        samples = []
+        option_counts = collections.Counter()
+        wrong_answers = 0
+        for _ in range(args.questions):
+            start = time.perf_counter()
+            question = generate_math_question(grade)
+            samples.append(time.perf_counter() - start)
+            option_counts[len({normalize_value(option) for option in question['options']})] += 1
+            if (Fraction(question['correct_answer']) != _solve(question['question'])
+                    or question['options'][question['correct_index']] != question['correct_answer']):
+                wrong_answers += 1
+        _report(f'grade {grade}', samples)
+        distribution = ', '.join(f'{count} options: {n}' for count, n in sorted(option_counts.items()))
+        print(f"  {'':<28} {distribution}; wrong answer keys: {wrong_answers}")
+
+
+def bench_math_batch(args):
+    """Bulk math question generation: the scalar generator in a loop vs the NumPy batch generator."""
+    if np is None:
+        print("numpy is not installed; generate_math_questions falls back to the scalar generator")
+        return
+    for grade in [int(g) for g in args.grades.split(',')]:
+        random.seed(args.seed)
+        rng = np.random.default_rng(args.seed)
+        generate_math_questions(grade, VECTOR_MIN, rng)  # Build the lookup tables outside the timing
+        timings = {}
+        for label, generate in [('scalar loop', lambda: [generate_math_question(grade) for _ in range(args.count)]),
+                                ('numpy batch', lambda: generate_math_questions(grade, args.count, rng))]:
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                questions = generate()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = best
+            print(f"grade {grade:>2} {label:<12} {best:7.3f}s  {args.count / best:>10,.0f} questions/s  "
+                  f"malformed={_check_questions(questions)}")
+        print(f"grade {grade:>2} speedup      {timings['scalar loop'] / timings['numpy batch']:6.1f}x")
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """The Cat API search and an image host, with the failures the downloader has to survive.
+
+    The first search for breed b1 answers 503 and every fifth search 429 with
+    Retry-After: 1. The first request for image b2/0 drops the connection,
+    b3/1 is always 404 and images of `server.failing_breed` answer 500.
+    Search results point at localhost and searches arrive on 127.0.0.1, so
+    the two count as separate hosts.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type=None, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        host = self.headers['Host'].split(':')[0]
+        with self.server.lock:
+            self.server.requests[host].append(time.monotonic())
+            self.server.seen[url.path] += 1
+            seen = self.server.seen[url.path]
+        if url.path == '/v1/images/search':
+            query = parse_qs(url.query)
+            breed = query.get('breed_ids', ['any'])[0]
+            if breed == 'b1' and not self.server.seen[f'503 {breed}']:
+                self.server.seen[f'503 {breed}'] += 1
+                return self._send(503)
+            if seen % 5 == 0:
+                return self._send(429, headers=[('Retry-After', '1')])
+            port = self.server.server_address[1]
+            results = [{'url': f'http://localhost:{port}/img/{breed}/{i}.jpg'}
+                       for i in range(int(query.get('limit', ['1'])[0]))]
+            return self._send(200, json.dumps(results).encode(), 'application/json')
+        if url.path == '/img/b2/0.jpg' and seen == 1:
+            self.close_connection = True
+            return
+        if url.path == '/img/b3/1.jpg':
+            return self._send(404)
+        if self.server.failing_breed and url.path.startswith(f'/img/{self.server.failing_breed}/'):
+            return self._send(500)
+        time.sleep(0.05)  # Transfer time
+        return self._send(200, b'\xff\xd8' + os.urandom(2000), 'image/jpeg')
+
+
+def _busiest_second(times):
+    """Most requests in any one-second window."""
+    times = sorted(times)
+    return max((sum(1 for t in times[i:] if t < start + 1) for i, start in enumerate(times)), default=0)
+
+
+def bench_downloads(args):
+    """Cat image downloads against a stand-in server: time, per-host rates, retries and resuming."""
+    import download_cat_images as downloader  # Needs requests, which no other benchmark does
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+    server.lock = threading.Lock()
+    server.requests = collections.defaultdict(list)  # Host -> request times
+    server.seen = collections.Counter()
+    server.failing_breed = 'b4'  # Until the resumed run, as if that host had been down
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    downloader.CAT_API_URL = f'http://127.0.0.1:{server.server_address[1]}/v1/images/search'
+    downloader.IMAGES_PER_BREED = args.images
+    downloader.HOST_RATES = {'127.0.0.1': args.search_rate}
+    downloader.DEFAULT_HOST_RATE = args.image_rate
+    downloader.RETRY_BACKOFF = 0.1
+    breeds = [{'name': f'Breed {i}', 'api_id': f'b{i}'} for i in range(args.breeds)]
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader.ASSETS_DIR = Path(tmp)
+        manifest_path = os.path.join(tmp, '.download_manifest.json')
+        for run in ('first run', 'resumed run'):
+            before = {host: len(times) for host, times in server.requests.items()}
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                downloader.download_all(breeds, downloader.Manifest(manifest_path), args.workers)
+            elapsed = time.perf_counter() - start
+            on_disk = sum(1 for path in Path(tmp).glob('*/*.jpg'))
+            print(f"{run}: {elapsed:.2f}s, {on_disk}/{args.breeds * args.images} images on disk")
+            for host, times in sorted(server.requests.items()):
+                bucket = downloader.host_bucket(host)
+                times = times[before.get(host, 0):]
+                print(f"  {host:<10} {len(times):4} requests, busiest second {_busiest_second(times):3} "
+                      f"(limit {bucket.rate:g}/s after a burst of {bucket.capacity:g})")
+            server.failing_breed = None
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scores_parser = subparsers.add_parser('scores', help='score store per-answer latency')
+    scores_parser.add_argument('--sizes', default='10,1000,100000', help='comma-separated player counts')
+    scores_parser.add_argument('--answers', type=int, default=200, help='answers to time per size')
+    scores_parser.set_defaults(func=bench_scores)
+
+    concurrency_parser = subparsers.add_parser('concurrency', help='lost-update stress test and lock throughput')
+    concurrency_parser.add_argument('--threads', type=int, default=300, help='concurrent threads')
+    concurrency_parser.add_argument('--answers', type=int, default=200, help='answers per thread')
+    concurrency_parser.add_argument('--players', type=int, default=50, help='distinct players')
+    concurrency_parser.set_defaults(func=bench_concurrency)
+
+    batching_parser = subparsers.add_parser('batching', help='LLM grading throughput vs batch size')
+    batching_parser.add_argument('--batch-sizes', default='1,2,4,8,16', help='comma-separated batch sizes')
+    batching_parser.add_argument('--clients', type=int, default=32, help='concurrent answering clients')
+    batching_parser.add_argument('--rounds', type=int, default=4, help='answers per client')
+    batching_parser.add_argument('--window-ms', type=float, default=30, help='batch collection window')
+    batching_parser.add_argument('--model', help='real Ollama model to grade with (default: simulated)')
+    batching_parser.add_argument('--fixed-ms', type=float, default=300, help='simulated cost per call')
+    batching_parser.add_argument('--per-item-ms', type=float, default=40, help='simulated cost per batched item')
+    batching_parser.set_defaults(func=bench_batching)
+
+    distractors_parser = subparsers.add_parser('distractors', help='multiple-choice distractor index')
+    distractors_parser.add_argument('--sizes', default='200,10000,100000', help='comma-separated deck sizes')
+    distractors_parser.add_argument('--lookups', type=int, default=200, help='option lookups to time per size')
+    distractors_parser.set_defaults(func=bench_distractors)
+
+    scheduler_parser = subparsers.add_parser('scheduler', help='weakest-word selection per question')
+    scheduler_parser.add_argument('--sizes', default='200,10000,200000', help='comma-separated deck sizes')
+    scheduler_parser.add_argument('--questions', type=int, default=200, help='questions to time per size')
+    scheduler_parser.set_defaults(func=bench_scheduler)
+
+    math_parser = subparsers.add_parser('math', help='per-question math generation latency and option counts')
+    math_parser.add_argument('--questions', type=int, default=20000, help='questions per grade')
+    math_parser.add_argument('--grades', default='2,5,12', help='comma-separated grades')
+    math_parser.add_argument('--seed', type=int, default=0, help='random seed')
+    math_parser.set_defaults(func=bench_math)
+
+    math_batch_parser = subparsers.add_parser('math-batch', help='bulk math question generation, scalar vs numpy')
+    math_batch_parser.add_argument('--count', type=int, default=100000, help='questions per grade')
+    math_batch_parser.add_argument('--grades', default='2,5,12', help='comma-separated grades')
+    math_batch_parser.add_argument('--repeat', type=int, default=3, help='runs per generator; the best is reported')
+    math_batch_parser.add_argument('--seed', type=int, default=0, help='random seed')
+    math_batch_parser.set_defaults(func=bench_math_batch)
+
+    downloads_parser = subparsers.add_parser('downloads', help='cat image downloader against a failing stand-in server')
+    downloads_parser.add_argument('--breeds', type=int, default=6, help='breeds to search')
+    downloads_parser.add_argument('--images', type=int, default=4, help='images per breed')
+    downloads_parser.add_argument('--workers', type=int, default=8, help='requests in flight at once')
+    downloads_parser.add_argument('--search-rate', type=float, default=5.0, help='search requests per second')
+    downloads_parser.add_argument('--image-rate', type=float, default=20.0, help='image requests per second')
+    downloads_parser.set_defaults(func=bench_downloads)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+In-memory index of the downloaded cat breed images.
+
+/api/cat_images used to glob the breed directory eight times (four
+extensions, both cases) and sort the results on every level-up card.
+CatImageIndex scans assets/cat_images/<breed>/ once at startup and keeps
+each breed's ordered URL list. URLs end in ?v=<version of the file>, so a
+rewritten image gets a new URL and browsers can cache them for good. A
+directory's mtime changes when files are added, removed or renamed in it,
+so a lookup re-stats the directory at most every `check_interval` seconds
+and rescans it only if the mtime moved.
+"""
+
+import os
+import threading
+import time
+
+from thumbnails import file_version
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def breed_dir_name(breed_name):
+    """Directory name for a breed: lowercase, underscores for spaces, no apostrophes."""
+    return breed_name.strip().lower().replace(' ', '_').replace("'", '')
+
+
+class CatImageIndex:
+    """Breed directory name -> up to `limit` image URLs, sorted by file name."""
+
+    def __init__(self, root='assets/cat_images', url_prefix='/assets/cat_images', limit=6, check_interval=5.0):
+        self.root = root
+        self.url_prefix = url_prefix
+        self.limit = limit
+        self.check_interval = check_interval
+        self._entries = {}  # directory name -> (checked at, mtime_ns or None, tuple of URLs)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.rescans = 0
+        self.build()
+
+    def _scan(self, name):
+        """(mtime_ns, URLs) for one breed directory; (None, ()) if it doesn't exist."""
+        path = os.path.join(self.root, name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            files = sorted((entry.name, file_version(entry.stat())) for entry in os.scandir(path)
+                           if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS)
+        except (FileNotFoundError, NotADirectoryError):
+            return None, ()
+        return mtime, tuple(f'{self.url_prefix}/{name}/{file}?v={version}' for file, version in files[:self.limit])
+
+    def build(self):
+        """Scan every breed directory under the root."""
+        try:
+            names = [entry.name for entry in os.scandir(self.root) if entry.is_dir()]
+        except FileNotFoundError:
+            names = []
+        now = time.monotonic()
+        entries = {}
+        for name in names:
+            mtime, urls = self._scan(name)
+            entries[name] = (now, mtime, urls)
+        with self._lock:
+            self._entries = entries
+
+    def _refresh(self, name, now):
+        try:
+            mtime = os.stat(os.path.join(self.root, name)).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            mtime = None
+        entry = self._entries.get(name)
+        if entry is not None and entry[1] == mtime:
+            entry = (now, mtime, entry[2])
+        elif mtime is None:
+            entry = (now, None, ())
+        else:
+            mtime, urls = self._scan(name)
+            entry = (now, mtime, urls)
+            with self._lock:
+                self.rescans += 1
+        if mtime is not None or name in self._entries:
+            self._entries[name] = entry  # Unknown names aren't kept, so made-up breeds can't grow the index
+        return entry
+
+    def images(self, breed_name):
+        """Image URLs for `breed_name`; empty if none have been downloaded."""
+        name = breed_dir_name(breed_name)
+        if not name or name.startswith('.') or '/' in name or '\\' in name:
+            return []
+        now = time.monotonic()
+        entry = self._entries.get(name)
+        if entry is None or now - entry[0] >= self.check_interval:
+            entry = self._refresh(name, now)
+        with self._lock:
+            self.lookups += 1
+        return list(entry[2])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'breeds': sum(1 for _, mtime, urls in self._entries.values() if urls),
+                'images': sum(len(urls) for _, mtime, urls in self._entries.values()),
+                'lookups': self.lookups,
+                'rescans': self.rescans,
+            }
@@ -0,0 +1,176 @@
+"""
+Precomputed multiple-choice distractors.
+
+For every definition in the deck, DistractorIndex keeps a short ranked list
+of other definitions that are close in meaning but not the same, so building
+the options for a missed word is a dictionary lookup instead of a scan of the
+whole deck. Similarity comes from definition embeddings when they are
+available, otherwise from hashed bag-of-stems vectors. Without NumPy a
+pure-Python inverted index over stems is used instead.
+"""
+
+import collections
+import heapq
+import math
+import random
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency; falls back to the inverted index
+    np = None
+
+from lexical_grader import content_stems
+
+LEXICAL_DIMENSIONS = 256  # Width of the hashed bag-of-stems vectors
+EXACT_LIMIT = 4000  # Up to this many definitions every pair is compared; above it, only within clusters
+SAME_MEANING = 0.95  # More similar than this is probably a correct answer too, not a distractor
+MAX_POSTING = 200  # Inverted index: stems in more definitions than this are too common to rank by
+_BLOCK_CELLS = 1 << 22  # Similarity cells computed per block (16 MB of float32)
+
+
+def lexical_vectors(definitions, dimensions=LEXICAL_DIMENSIONS):
+    """IDF-weighted bag-of-stems vectors, randomly projected to `dimensions` and L2-normalized."""
+    stems = [content_stems(definition) for definition in definitions]
+    stem_ids = {}
+    rows, columns = [], []
+    for row, definition_stems in enumerate(stems):
+        for stem in set(definition_stems):
+            rows.append(row)
+            columns.append(stem_ids.setdefault(stem, len(stem_ids)))
+    vectors = np.zeros((len(definitions), dimensions), dtype=np.float32)
+    if not rows:
+        return vectors
+    rows = np.asarray(rows, dtype=np.int64)
+    columns = np.asarray(columns, dtype=np.int64)
+    document_frequency = np.bincount(columns, minlength=len(stem_ids))
+    idf = np.log((1 + len(definitions)) / (1 + document_frequency)).astype(np.float32) + 1.0
+    # A fixed pseudo-random direction per stem, seeded by the stem itself so vectors are reproducible
+    signatures = np.empty((len(stem_ids), dimensions), dtype=np.float32)
+    for stem, column in stem_ids.items():
+        signatures[column] = np.random.default_rng(zlib.crc32(stem.encode())).standard_normal(dimensions)
+    weighted = signatures * idf[:, None]
+    # Add the j-th term of every definition in one vectorized step; no definition repeats within a step
+    starts = np.r_[0, np.flatnonzero(rows[1:] != rows[:-1]) + 1]
+    position = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    for j in range(int(position.max()) + 1):
+        selected = position == j
+        vectors[rows[selected]] += weighted[columns[selected]]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _nearest(vectors, members, k, neighbours):
+    """Fill neighbours[m] with the k most similar rows among `members` for each m in `members`."""
+    candidates = vectors[members]
+    block = max(1, _BLOCK_CELLS // max(1, len(members)))
+    width = min(k, len(members) - 1)
+    if width <= 0:
+        return
+    for begin in range(0, len(members), block):
+        queries = members[begin:begin + block]
+        similarity = vectors[queries] @ candidates.T
+        similarity[np.arange(len(queries)), np.arange(begin, begin + len(queries))] = -np.inf
+        similarity[similarity > SAME_MEANING] = -np.inf
+        top = np.argpartition(-similarity, width - 1, axis=1)[:, :width]
+        top_similarity = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_similarity, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_similarity = np.take_along_axis(top_similarity, order, axis=1)
+        for query, ranked, scores in zip(queries.tolist(), members[top].tolist(), top_similarity.tolist()):
+            neighbours[query] = [row for row, score in zip(ranked, scores) if score != -math.inf]
+
+
+def nearest_neighbours(vectors, k, exact_limit=EXACT_LIMIT, seed=0):
+    """Top-k most similar other rows for every row of a normalized matrix.
+
+    Small decks compare every pair. Larger ones assign rows to sqrt(n) sampled
+    centroids and only compare rows within the same cluster, which keeps a
+    100k-definition deck to a few seconds.
+    """
+    count = len(vectors)
+    neighbours = [[] for _ in range(count)]
+    if count <= exact_limit:
+        _nearest(vectors, np.arange(count), k, neighbours)
+        return neighbours
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(count, int(math.sqrt(count)), replace=False)]
+    assignment = np.empty(count, dtype=np.int64)
+    block = max(1, _BLOCK_CELLS // len(centroids))
+    for begin in range(0, count, block):
+        assignment[begin:begin + block] = np.argmax(vectors[begin:begin + block] @ centroids.T, axis=1)
+    order = np.argsort(assignment, kind='stable')
+    bounds = np.flatnonzero(np.diff(assignment[order])) + 1
+    for members in np.split(order, bounds):
+        _nearest(vectors, members, k, neighbours)
+    return neighbours
+
+
+def inverted_index_neighbours(definitions, k):
+    """Pure-Python ranking by IDF-weighted shared stems, for when NumPy is missing."""
+    stems = [frozenset(content_stems(definition)) for definition in definitions]
+    postings = collections.defaultdict(list)
+    for row, definition_stems in enumerate(stems):
+        for stem in definition_stems:
+            postings[stem].append(row)
+    idf = {stem: math.log((1 + len(definitions)) / (1 + len(rows))) + 1.0 for stem, rows in postings.items()}
+    neighbours = []
+    for row, definition_stems in enumerate(stems):
+        scores = collections.Counter()
+        for stem in definition_stems:
+            if len(postings[stem]) <= MAX_POSTING:
+                for other in postings[stem]:
+                    if other != row and stems[other] != definition_stems:
+                        scores[other] += idf[stem]
+        neighbours.append([other for other, _ in heapq.nlargest(k, scores.items(), key=lambda item: item[1])])
+    return neighbours
+
+
+class DistractorIndex:
+    """Ranked wrong-but-plausible definitions for every definition in the deck.
+
+    `vectors`, if given, must hold one normalized row per unique definition in
+    first-seen order (as EmbeddingGrader.matrix does); otherwise lexical
+    vectors are built. options() is O(1) per call.
+    """
+
+    def __init__(self, definitions, candidates=8, vectors=None):
+        start = time.perf_counter()
+        self.definitions = list(dict.fromkeys(definitions))
+        self._row_for = {definition: row for row, definition in enumerate(self.definitions)}
+        if np is None:
+            self.source = 'inverted-index'
+            rows = inverted_index_neighbours(self.definitions, candidates)
+        else:
+            self.source = 'embeddings' if vectors is not None else 'lexical'
+            if vectors is None:
+                vectors = lexical_vectors(self.definitions)
+            rows = nearest_neighbours(np.asarray(vectors, dtype=np.float32), candidates)
+        self._neighbours = [[self.definitions[other] for other in ranked] for ranked in rows]
+        self.build_seconds = time.perf_counter() - start
+
+    def options(self, definition, count=3, rng=random):
+        """`count` wrong definitions to show next to `definition`, most plausible first.
+
+        Picks at random among the precomputed neighbours and tops up with
+        random definitions when a definition has too few neighbours.
+        """
+        row = self._row_for.get(definition)
+        ranked = self._neighbours[row] if row is not None else []
+        picks = rng.sample(ranked, min(count, len(ranked)))
+        available = len(self.definitions) - (1 if row is not None else 0)
+        while len(picks) < min(count, available):
+            candidate = rng.choice(self.definitions)
+            if candidate != definition and candidate not in picks:
+                picks.append(candidate)
+        return picks
+
+    def stats(self):
+        return {
+            'source': self.source,
+            'definitions': len(self.definitions),
+            'build_seconds': self.build_seconds,
+            'with_neighbours': sum(1 for ranked in self._neighbours if ranked),
+        }
@@ -3,23 +3,37 @@
 Script to download cat breed images from various sources.
 This script will download up to 9 images for each cat breed and save them locally.
 
+Searches and downloads run on a small thread pool. Each host gets a
+token-bucket rate limit (HOST_RATES) instead of a fixed sleep after every
+call, and failed requests are retried with exponential backoff. Search
+results are saved to a manifest as they arrive, and an image only gets its
+real name once it is complete, so an interrupted run resumes where it
+stopped: breeds already searched aren't searched again and finished images
+are skipped. `python3 benchmark.py downloads` runs it against a local
+stand-in server.
+
 Usage:
-    python3 download_cat_images.py
+    python3 download_cat_images.py [--workers N] [--fresh]
 
 Requirements:
     - requests library
     - Optional: GOOGLE_API_KEY and GOOGLE_CX for Google Image Search
     - Optional: UNSPLASH_ACCESS_KEY for Unsplash
     - Optional: PEXELS_API_KEY for Pexels
+    - Optional: GOOGLE_SEARCH_URL, UNSPLASH_SEARCH_URL and CAT_API_URL point
+      the searches at another server, e.g. a local stand-in for testing
 """
 
 import os
 import json
+import random
+import argparse
+import threading
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from urllib.parse import urlparse
-import hashlib
 
 # Load cat breeds from JSON file (same as main.py)
 def load_cat_breeds():
@@ -38,20 +52,101 @@ def load_cat_breeds():
 CAT_BREEDS = load_cat_breeds()
 
 ASSETS_DIR = Path('assets/cat_images')
+MANIFEST_FILE = ASSETS_DIR / '.download_manifest.json'  # Search results per breed, for resuming
 IMAGES_PER_BREED = 9
-DOWNLOAD_DELAY = 1  # Seconds between downloads to be respectful
+WORKERS = 8  # Searches or downloads in flight at once
+HOST_RATES = {  # Requests per second allowed to each host, to be respectful
+    'www.googleapis.com': 1.0,
+    'api.unsplash.com': 1.0,
+    'api.thecatapi.com': 2.0,
+}
+DEFAULT_HOST_RATE = 4.0  # Requests per second to any other host (the image servers)
+MAX_RETRIES = 3  # Retries after a connection error, timeout, 429 or 5xx
+RETRY_BACKOFF = 1.0  # Seconds before the first retry; doubles with every retry
+
+GOOGLE_SEARCH_URL = os.environ.get('GOOGLE_SEARCH_URL', 'https://www.googleapis.com/customsearch/v1')
+UNSPLASH_SEARCH_URL = os.environ.get('UNSPLASH_SEARCH_URL', 'https://api.unsplash.com/search/photos')
+CAT_API_URL = os.environ.get('CAT_API_URL', 'https://api.thecatapi.com/v1/images/search')
 
 def sanitize_filename(name):
     """Convert breed name to safe filename."""
     return name.lower().replace(' ', '_').replace("'", '')
 
+class TokenBucket:
+    """Allows `rate` requests per second on average, in bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every request for `seconds`, e.g. after the host answered 429."""
+        with self.lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+_local = threading.local()
+
+def host_bucket(host):
+    """The shared rate limit for requests to `host`."""
+    with _buckets_lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(HOST_RATES.get(host, DEFAULT_HOST_RATE))
+        return _buckets[host]
+
+def http_get(url, **kwargs):
+    """requests.get within the host's rate limit, retrying connection errors, timeouts, 429 and 5xx.
+
+    Returns the last response once retries run out; raises if the last try
+    could not connect.
+    """
+    bucket = host_bucket(urlparse(url).hostname)
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()  # One connection pool per worker thread
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        delay = RETRY_BACKOFF * 2 ** attempt * random.uniform(1, 1.5)
+        try:
+            response = _local.session.get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+        else:
+            if (response.status_code != 429 and response.status_code < 500) or attempt == MAX_RETRIES:
+                return response
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            if response.status_code == 429:
+                bucket.pause(delay)
+            response.close()
+        time.sleep(delay)
+
 def download_image(url, filepath):
     """Download an image from URL and save to filepath."""
+    partial = filepath.with_name(filepath.name + '.part')
     try:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        response = requests.get(url, headers=headers, timeout=10, stream=True)
+        response = http_get(url, headers=headers, timeout=10, stream=True)
         response.raise_for_status()
         
         # Check if it's actually an image
@@ -59,18 +154,22 @@ def download_image(url, filepath):
         if not content_type.startswith('image/'):
             return False
         
-        # Save the image
-        with open(filepath, 'wb') as f:
+        # Save the image; it only gets its real name once complete, so an interrupted run retries it
+        with open(partial, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
                 f.write(chunk)
         
         # Verify file was created and has content
-        if filepath.exists() and filepath.stat().st_size > 0:
+        if partial.stat().st_size > 0:
+            os.replace(partial, filepath)
             return True
         return False
     except Exception as e:
         print(f"  Error downloading {url}: {e}")
         return False
+    finally:
+        if partial.exists():
+            partial.unlink()
 
 def fetch_google_images(breed_name, num_images=5):
     """Fetch images from Google Custom Search API."""
@@ -91,7 +190,7 @@ def fetch_google_images(breed_name, num_images=5):
     
     try:
         for query in search_queries[:num_images]:
-            url = 'https://www.googleapis.com/customsearch/v1'
+            url = GOOGLE_SEARCH_URL
             params = {
                 'key': api_key,
                 'cx': cx,
@@ -102,7 +201,7 @@ def fetch_google_images(breed_name, num_images=5):
                 'imgSize': 'medium',
                 'imgType': 'photo'
             }
-            response = requests.get(url, params=params, timeout=5)
+            response = http_get(url, params=params, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 if data.get('items') and len(data['items']) > 0:
@@ -113,7 +212,6 @@ def fetch_google_images(breed_name, num_images=5):
             elif response.status_code == 429:
                 print(f"  Rate limit reached for Google API")
                 break
-            time.sleep(DOWNLOAD_DELAY)
     except Exception as e:
         print(f"  Error with Google API: {e}")
     
@@ -134,14 +232,14 @@ def fetch_unsplash_images(breed_name, num_images=5):
     
     try:
         for query in search_queries:
-            url = 'https://api.unsplash.com/search/photos'
+            url = UNSPLASH_SEARCH_URL
             headers = {'Authorization': f'Client-ID {api_key}'}
             params = {
                 'query': query,
                 'per_page': min(2, num_images - len(images)),
                 'orientation': 'squarish'
             }
-            response = requests.get(url, headers=headers, params=params, timeout=5)
+            response = http_get(url, headers=headers, params=params, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 if data.get('results'):
@@ -150,7 +248,8 @@ def fetch_unsplash_images(breed_name, num_images=5):
                             images.append(result['urls']['small'])
                             if len(images) >= num_images:
                                 break
-            time.sleep(DOWNLOAD_DELAY)
+            if len(images) >= num_images:
+                break
     except Exception as e:
         print(f"  Error with Unsplash API: {e}")
     
@@ -163,9 +262,9 @@ def fetch_cat_api_images(breed_name, num_images=5, api_id=None):
     try:
         if api_id:
             # Use the API ID directly
-            url = 'https://api.thecatapi.com/v1/images/search'
+            url = CAT_API_URL
             params = {'limit': num_images, 'breed_ids': api_id}
-            response = requests.get(url, params=params, timeout=5)
+            response = http_get(url, params=params, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 for item in data:
@@ -199,9 +298,9 @@ def fetch_cat_api_images(breed_name, num_images=5, api_id=None):
             breed_id = breed_id_map.get(breed_lower, None)
             
             if breed_id:
-                url = 'https://api.thecatapi.com/v1/images/search'
+                url = CAT_API_URL
                 params = {'limit': num_images, 'breed_ids': breed_id}
-                response = requests.get(url, params=params, timeout=5)
+                response = http_get(url, params=params, timeout=5)
                 if response.status_code == 200:
                     data = response.json()
                     for item in data:
@@ -209,86 +308,148 @@ def fetch_cat_api_images(breed_name, num_images=5, api_id=None):
                             images.append(item['url'])
             else:
                 # Fallback to general cat images
-                url = 'https://api.thecatapi.com/v1/images/search'
+                url = CAT_API_URL
                 params = {'limit': num_images}
-                response = requests.get(url, params=params, timeout=5)
+                response = http_get(url, params=params, timeout=5)
                 if response.status_code == 200:
                     data = response.json()
                     for item in data:
                         if 'url' in item:
                             images.append(item['url'])
-        time.sleep(DOWNLOAD_DELAY)
     except Exception as e:
         print(f"  Error with The Cat API: {e}")
     
     return images
 
-def download_breed_images(breed):
-    """Download images for a specific breed."""
+class Manifest:
+    """Search results per breed, saved after every change.
+
+    Finished images need no record: they are on disk under their final name.
+    """
+
+    def __init__(self, path, fresh=False):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.breeds = {}  # breed name -> image URLs found
+        if not fresh and self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.breeds = json.load(f).get('breeds', {})
+            except (OSError, ValueError):
+                print(f"Warning: ignoring unreadable manifest {self.path}")
+
+    def urls(self, breed_name):
+        """The saved search results for a breed, or None if it hasn't been searched."""
+        with self.lock:
+            return self.breeds.get(breed_name)
+
+    def set_urls(self, breed_name, urls):
+        with self.lock:
+            self.breeds[breed_name] = urls
+            self._save()
+
+    def _save(self):
+        # Write-then-rename, so an interrupted run never leaves a half-written manifest
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(self.path.name + '.tmp')
+        with open(temp, 'w') as f:
+            json.dump({'breeds': self.breeds}, f, indent=1)
+        os.replace(temp, self.path)
+
+def find_image_urls(breed):
+    """Search the configured sources for up to IMAGES_PER_BREED image URLs for a breed."""
     breed_name = breed.get('name', 'Unknown')
-    breed_dir = ASSETS_DIR / sanitize_filename(breed_name)
-    breed_dir.mkdir(parents=True, exist_ok=True)
-    
-    print(f"\nDownloading images for {breed_name}...")
-    
-    # Check how many images we already have
-    existing_images = list(breed_dir.glob('*.jpg')) + list(breed_dir.glob('*.png'))
-    if len(existing_images) >= IMAGES_PER_BREED:
-        print(f"  Already have {len(existing_images)} images, skipping...")
-        return
-    
-    # Try to fetch images from various sources
     all_image_urls = []
     
     # Try Google first (best quality)
     if os.environ.get('GOOGLE_API_KEY') and os.environ.get('GOOGLE_CX'):
-        print("  Trying Google Custom Search API...")
         urls = fetch_google_images(breed_name, IMAGES_PER_BREED)
         all_image_urls.extend(urls)
     
     # Try Unsplash
     if len(all_image_urls) < IMAGES_PER_BREED and os.environ.get('UNSPLASH_ACCESS_KEY'):
-        print("  Trying Unsplash API...")
         urls = fetch_unsplash_images(breed_name, IMAGES_PER_BREED - len(all_image_urls))
         all_image_urls.extend(urls)
     
     # Try The Cat API (free, no auth)
     if len(all_image_urls) < IMAGES_PER_BREED:
-        print("  Trying The Cat API...")
         # Use API ID if available, otherwise use breed name
         api_id = breed.get('api_id', None)
         urls = fetch_cat_api_images(breed_name, IMAGES_PER_BREED - len(all_image_urls), api_id)
         all_image_urls.extend(urls)
     
-    # Download the images
-    downloaded = 0
-    for i, image_url in enumerate(all_image_urls[:IMAGES_PER_BREED]):
-        # Determine file extension
-        parsed = urlparse(image_url)
-        ext = os.path.splitext(parsed.path)[1] or '.jpg'
-        if ext not in ['.jpg', '.jpeg', '.png', '.webp']:
-            ext = '.jpg'
-        
-        filepath = breed_dir / f"{i+1}{ext}"
+    return all_image_urls[:IMAGES_PER_BREED]
+
+def image_path(breed_dir, index, image_url):
+    """Where the index-th image of a breed is saved, keeping the URL's extension if it is an image one."""
+    parsed = urlparse(image_url)
+    ext = os.path.splitext(parsed.path)[1] or '.jpg'
+    if ext not in ['.jpg', '.jpeg', '.png', '.webp']:
+        ext = '.jpg'
+    return breed_dir / f"{index+1}{ext}"
+
+def download_all(breeds, manifest, workers=WORKERS):
+    """Search for and download images for every breed that has fewer than IMAGES_PER_BREED.
+
+    Breeds are searched in parallel, then all their images are downloaded
+    in parallel, `workers` requests at a time within the per-host limits.
+    Breeds already searched in an earlier run reuse the URLs in the
+    manifest, and files already on disk are skipped.
+    """
+    pending = []
+    for breed in breeds:
+        breed_name = breed.get('name', 'Unknown')
+        breed_dir = ASSETS_DIR / sanitize_filename(breed_name)
+        breed_dir.mkdir(parents=True, exist_ok=True)
         
-        if filepath.exists():
-            print(f"  Image {i+1} already exists, skipping...")
-            downloaded += 1
+        # Check how many images we already have
+        existing_images = list(breed_dir.glob('*.jpg')) + list(breed_dir.glob('*.png'))
+        if len(existing_images) >= IMAGES_PER_BREED:
+            print(f"{breed_name}: already have {len(existing_images)} images, skipping...")
             continue
+        pending.append((breed, breed_dir))
+    
+    downloaded = {breed.get('name', 'Unknown'): 0 for breed, _ in pending}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        searches = {pool.submit(find_image_urls, breed): breed.get('name', 'Unknown')
+                    for breed, _ in pending if manifest.urls(breed.get('name', 'Unknown')) is None}
+        for future in as_completed(searches):
+            breed_name = searches[future]
+            urls = future.result()
+            if urls:
+                manifest.set_urls(breed_name, urls)  # An empty result is searched again next run
+            print(f"{breed_name}: found {len(urls)} image URLs")
         
-        print(f"  Downloading image {i+1}/{IMAGES_PER_BREED}...")
-        if download_image(image_url, filepath):
-            downloaded += 1
-            print(f"    ✓ Saved to {filepath}")
-        else:
-            print(f"    ✗ Failed to download")
+        downloads = {}
+        for breed, breed_dir in pending:
+            breed_name = breed.get('name', 'Unknown')
+            for i, image_url in enumerate((manifest.urls(breed_name) or [])[:IMAGES_PER_BREED]):
+                filepath = image_path(breed_dir, i, image_url)
+                if filepath.exists():
+                    downloaded[breed_name] += 1
+                    continue
+                downloads[pool.submit(download_image, image_url, filepath)] = (breed_name, filepath, image_url)
         
-        time.sleep(DOWNLOAD_DELAY)
+        print(f"\nDownloading {len(downloads)} images...")
+        for future in as_completed(downloads):
+            breed_name, filepath, image_url = downloads[future]
+            if future.result():
+                downloaded[breed_name] += 1
+                print(f"  ✓ Saved to {filepath}")
+            else:
+                print(f"  ✗ Failed to download {image_url}")
     
-    print(f"  Downloaded {downloaded}/{IMAGES_PER_BREED} images for {breed_name}")
+    for breed_name, count in downloaded.items():
+        print(f"  Downloaded {count}/{IMAGES_PER_BREED} images for {breed_name}")
+    return downloaded
 
 def main():
     """Main function to download images for all breeds."""
+    parser = argparse.ArgumentParser(description='Download cat breed images into ' + str(ASSETS_DIR))
+    parser.add_argument('--workers', type=int, default=WORKERS, help=f'Requests in flight at once (default: {WORKERS})')
+    parser.add_argument('--fresh', action='store_true', help='Ignore saved search results and search every breed again')
+    args = parser.parse_args()
+    
     print("Cat Breed Image Downloader")
     print("=" * 50)
     
@@ -310,9 +471,9 @@ def main():
     print(f"\nWill download {IMAGES_PER_BREED} images per breed")
     print(f"Total breeds: {len(CAT_BREEDS)}")
     
-    # Download images for each breed
-    for breed in CAT_BREEDS:
-        download_breed_images(breed)
+    # Resume from the last run unless asked not to
+    manifest = Manifest(MANIFEST_FILE, fresh=args.fresh)
+    download_all(CAT_BREEDS, manifest, max(1, args.workers))
     
     print("\n" + "=" * 50)
     print("Download complete!")
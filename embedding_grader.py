@@ -0,0 +1,146 @@
+"""
+Embedding fast-path grader.
+
+Every definition in words.json is embedded once and kept as a row of a
+normalized NumPy matrix. A player's answer is embedded and compared to its
+definition by cosine similarity: clear matches are accepted, clear misses
+rejected, and only the ambiguous band in between is left for the chat model.
+"""
+
+import collections
+import os
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency; the grader stays disabled without it
+    np = None
+
+
+def _percentiles(samples, points=(50, 90, 99)):
+    if not samples:
+        return {f'p{p}': None for p in points}
+    ordered = sorted(samples)
+    return {f'p{p}': ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+            for p in points}
+
+
+class EmbeddingGrader:
+    """Accepts or rejects answers by cosine similarity to precomputed definition embeddings.
+
+    `embed` takes a list of strings and returns one vector per string.
+    grade() returns True/False for confident verdicts and None when the answer
+    falls between the thresholds (or the matrix is not built yet). Negations
+    barely move an embedding ("not deep" sits right next to "deep"), so the
+    caller can forbid an accept for answers that may reverse the definition.
+    """
+
+    def __init__(self, embed, model, definitions, accept_threshold=0.80, reject_threshold=0.40,
+                 cache_path=None):
+        self._embed = embed
+        self.model = model
+        self.definitions = list(dict.fromkeys(definitions))
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.cache_path = cache_path
+        self.matrix = None
+        self._row_for = {definition: i for i, definition in enumerate(self.definitions)}
+        self._lock = threading.Lock()
+        self.counts = collections.Counter()
+        self._latencies_ms = collections.deque(maxlen=1000)
+
+    @property
+    def ready(self):
+        return self.matrix is not None
+
+    def _embed_normalized(self, texts):
+        vectors = np.asarray(self._embed(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def build(self):
+        """Load the definition matrix from cache_path, or embed every definition and save it."""
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        if self.cache_path and os.path.exists(self.cache_path):
+            cached = np.load(self.cache_path, allow_pickle=False)
+            if (str(cached['model']) == self.model and
+                    cached['definitions'].tolist() == self.definitions):
+                self.matrix = cached['matrix']
+                return self.matrix
+        matrix = self._embed_normalized(self.definitions)
+        if self.cache_path:
+            np.savez(self.cache_path, matrix=matrix, model=np.array(self.model),
+                     definitions=np.array(self.definitions))
+        self.matrix = matrix
+        return matrix
+
+    def build_async(self, on_ready=None):
+        """Build in a background thread, then call on_ready(self) if given."""
+        def _build():
+            try:
+                self.build()
+            except Exception as e:
+                print(f"Embedding grader disabled: {e}")
+                return
+            if on_ready is not None:
+                on_ready(self)
+        threading.Thread(target=_build, name='embedding-build', daemon=True).start()
+
+    def similarity(self, answer, definition):
+        """Cosine similarity between an answer and a known definition, or None."""
+        row = self._row_for.get(definition)
+        if self.matrix is None or row is None:
+            return None
+        answer_vector = self._embed_normalized([answer])[0]
+        return float(self.matrix[row] @ answer_vector)
+
+    def grade(self, answer, definition, can_accept=True):
+        """True/False when confident, None to escalate to the chat model.
+
+        With can_accept=False an answer above the accept threshold is escalated instead.
+        """
+        start = time.perf_counter()
+        try:
+            score = self.similarity(answer, definition)
+        except Exception:
+            score = None
+        with self._lock:
+            self.counts['total'] += 1
+            if score is None:
+                self.counts['unavailable'] += 1
+                return None
+            self._latencies_ms.append((time.perf_counter() - start) * 1000)
+            if score >= self.accept_threshold:
+                if not can_accept:
+                    self.counts['held_back'] += 1
+                    return None
+                self.counts['accepted'] += 1
+                return True
+            if score <= self.reject_threshold:
+                self.counts['rejected'] += 1
+                return False
+            self.counts['escalated'] += 1
+            return None
+
+    def stats(self):
+        with self._lock:
+            total = self.counts['total']
+            decided = self.counts['accepted'] + self.counts['rejected']
+            return {
+                'ready': self.ready,
+                'model': self.model,
+                'definitions': len(self.definitions),
+                'accept_threshold': self.accept_threshold,
+                'reject_threshold': self.reject_threshold,
+                'total': total,
+                'accepted': self.counts['accepted'],
+                'rejected': self.counts['rejected'],
+                'escalated': self.counts['escalated'],
+                'held_back': self.counts['held_back'],
+                'unavailable': self.counts['unavailable'],
+                'fraction_without_llm': decided / total if total else 0.0,
+                'latency_ms': _percentiles(list(self._latencies_ms)),
+            }
@@ -0,0 +1,103 @@
+"""
+Two-tier cache of LLM grading verdicts.
+
+Kids type the same short answers to the same definitions over and over, so
+verdicts are cached by (normalized answer, definition, model, prompt version).
+The memory tier is a bounded LRU; the disk tier is a small SQLite table so
+verdicts survive restarts and are shared across players.
+"""
+
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def normalize_answer(text):
+    """Lowercase, collapse whitespace and drop surrounding punctuation."""
+    text = re.sub(r'\s+', ' ', text.strip().lower())
+    return text.strip(' .,!?;:"\'')
+
+
+class GradeCache:
+    """LRU verdict cache with an optional on-disk SQLite tier."""
+
+    def __init__(self, path=None, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS verdicts (
+                    answer TEXT NOT NULL,
+                    definition TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_version INTEGER NOT NULL,
+                    verdict INTEGER NOT NULL,
+                    PRIMARY KEY (answer, definition, model, prompt_version)
+                ) WITHOUT ROWID
+            """)
+
+    @staticmethod
+    def _key(answer, definition, model, prompt_version):
+        return (normalize_answer(answer), definition, model, prompt_version)
+
+    def _remember(self, key, verdict):
+        self._entries[key] = verdict
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, answer, definition, model, prompt_version):
+        """Return the cached verdict (True/False) or None on a miss."""
+        key = self._key(answer, definition, model, prompt_version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return self._entries[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT verdict FROM verdicts WHERE answer = ? AND definition = ? "
+                    "AND model = ? AND prompt_version = ?", key).fetchone()
+                if row is not None:
+                    verdict = bool(row[0])
+                    self._remember(key, verdict)
+                    self.disk_hits += 1
+                    return verdict
+            self.misses += 1
+            return None
+
+    def put(self, answer, definition, model, prompt_version, verdict):
+        key = self._key(answer, definition, model, prompt_version)
+        with self._lock:
+            self._remember(key, verdict)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO verdicts "
+                    "(answer, definition, model, prompt_version, verdict) VALUES (?, ?, ?, ?, ?)",
+                    (*key, int(verdict)))
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
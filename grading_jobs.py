@@ -0,0 +1,92 @@
+"""
+Asynchronous grading jobs.
+
+Grading a free-text answer can hold a web worker for the length of an LLM
+call. GradingJobs runs those calls on a small bounded thread pool instead:
+the request gets a job id back immediately and the client polls (or
+long-polls) for the verdict.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class QueueFull(Exception):
+    """Raised by submit() when `max_pending` jobs are already queued or running."""
+
+
+class GradingJobs:
+    """Bounded executor plus a table of finished results kept for `result_ttl` seconds."""
+
+    def __init__(self, max_workers=4, max_pending=64, result_ttl=300):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='grading')
+        self._jobs = {}  # job id -> (future, submitted_at)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+
+    def _expire(self, now):
+        expired = [job_id for job_id, (future, submitted_at) in self._jobs.items()
+                   if future.done() and now - submitted_at > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args):
+        """Queue fn(*args). Returns the job id, or raises QueueFull."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull()
+            now = time.monotonic()
+            self._expire(now)
+            self._pending += 1
+            self.submitted += 1
+            job_id = uuid.uuid4().hex
+            future = self._executor.submit(fn, *args)
+            self._jobs[job_id] = (future, now)
+        future.add_done_callback(self._finished)
+        return job_id
+
+    def result(self, job_id, wait=0):
+        """Return ('done', result), ('error', message), ('pending', None) or ('unknown', None).
+
+        With wait > 0 this blocks up to `wait` seconds for the job to finish (long-poll).
+        """
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is None:
+            return 'unknown', None
+        future = entry[0]
+        if wait > 0 and not future.done():
+            try:
+                future.exception(timeout=wait)
+            except FutureTimeout:
+                pass
+        if not future.done():
+            return 'pending', None
+        error = future.exception()
+        if error is not None:
+            return 'error', str(error)
+        return 'done', future.result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'results_held': len(self._jobs),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,115 @@
+"""
+Precomputed level tables.
+
+Every answer used to rebuild the player's levels: copy the whole element or
+breed dict (facts list included), add the level fields and serialize it all
+again. LevelService builds one read-only record per level at startup and
+serves all of them once, as a versioned catalog the browser can cache for
+good. Responses carry only each level's number, cycle and progress; the
+finished `"levels":...,"level_types":...` fragment is cached for each
+(score, level types) pair, so adding levels to a response is a dictionary
+lookup.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+_SEPARATORS = (',', ':')  # Same compact form Flask uses outside debug mode
+
+
+def _dumps(value):
+    return json.dumps(value, separators=_SEPARATORS, sort_keys=True)
+
+
+class LevelService:
+    """Level records for each track ('chemistry', 'cat', ...), cycling every len(records) levels.
+
+    `tracks` maps a level type to its list of records. A score of s is level
+    (s // points_per_level) % len(records) + 1 of cycle
+    (s // points_per_level) // len(records) + 1. The catalog holds every
+    track, `points_per_level` and any `extras` (lists served alongside, such
+    as habitat items); its version is a hash of its contents. The dicts
+    returned by levels() are shared between callers and must not be
+    modified; level() returns a full, fresh dict for callers that want one.
+    """
+
+    def __init__(self, tracks, points_per_level=10, max_entries=4096, extras=None):
+        self.points_per_level = points_per_level
+        self.max_entries = max_entries
+        self._records = {}  # level type -> tuple of read-only records
+        for level_type, records in tracks.items():
+            self._records[level_type] = tuple(
+                MappingProxyType({**record, 'facts': tuple(record.get('facts', ()))}) for record in records)
+        catalog = {**(extras or {}), **tracks, 'points_per_level': points_per_level}
+        self.catalog_version = hashlib.sha256(_dumps(catalog).encode()).hexdigest()[:16]
+        self.catalog_json = _dumps(dict(catalog, version=self.catalog_version)).encode()
+        self._levels = OrderedDict()  # (score, level types) -> (levels dict, JSON fragment)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _position(self, level_type, score):
+        """(index, cycle, score_required, next_level_score, progress) for `score`."""
+        total = len(self._records[level_type])
+        level, points = divmod(score, self.points_per_level)
+        cycle, index = divmod(level, total)
+        score_required = index * self.points_per_level
+        next_level_score = cycle * self.points_per_level * total + score_required + self.points_per_level
+        return index, cycle, score_required, next_level_score, points / self.points_per_level
+
+    def level(self, level_type, score):
+        """A new dict with the record for `score` plus level, cycle, score_required, next_level_score and progress."""
+        index, cycle, score_required, next_level_score, progress = self._position(level_type, score)
+        record = dict(self._records[level_type][index])
+        record['facts'] = list(record['facts'])
+        record.update(level=index + 1, cycle=cycle + 1, score_required=score_required,
+                      next_level_score=next_level_score, progress=progress)
+        return record
+
+    def _build(self, score, level_types):
+        levels = {}
+        for level_type in level_types:
+            if level_type in self._records:
+                index, cycle, _, _, progress = self._position(level_type, score)
+                levels[level_type] = {'level': index + 1, 'cycle': cycle + 1, 'progress': progress}
+        fragment = '"catalog":%s,"levels":%s,"level_types":%s' % (
+            _dumps(self.catalog_version), _dumps(levels), _dumps(list(level_types)))
+        return levels, fragment
+
+    def _entry(self, score, level_types):
+        key = (score, tuple(level_types))
+        with self._lock:
+            entry = self._levels.get(key)
+            if entry is not None:
+                self._levels.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = self._build(score, key[1])
+        with self._lock:
+            self._levels[key] = entry
+            while len(self._levels) > self.max_entries:
+                self._levels.popitem(last=False)
+        return entry
+
+    def levels(self, score, level_types):
+        """The shared {level type: {'level', 'cycle', 'progress'}} for `score`; do not modify it."""
+        return self._entry(score, level_types)[0]
+
+    def fragment(self, score, level_types):
+        """The JSON object members `"catalog":...,"levels":{...},"level_types":[...]`, ready to splice into a response."""
+        return self._entry(score, level_types)[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tracks': {level_type: len(records) for level_type, records in self._records.items()},
+                'catalog_version': self.catalog_version,
+                'catalog_bytes': len(self.catalog_json),
+                'entries': len(self._levels),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
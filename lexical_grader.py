@@ -0,0 +1,193 @@
+"""
+Deterministic lexical pre-grader.
+
+Decides the obvious cases without any model: an answer made of exactly the
+content words of the definition (after stopword removal, light stemming and
+typo-tolerant matching) is accepted, and only empty answers and non-answers
+like "idk" are rejected. Any extra word can turn the meaning around ("the
+opposite of ..."), so answers with extra words, negations or contrast words
+are left to the slower graders, as is anything else it can't be sure of.
+Works fully offline.
+"""
+
+import collections
+import functools
+import re
+import threading
+
+# Negations ("not", "no") are deliberately kept: "embarrassed" must not match "not embarrassed".
+# So are words that can be a whole answer on their own ("kind", "more", "some", "one", "like")
+STOPWORDS = frozenset("""
+    a an the and or but of to in on at by for with from into onto about as is are was were be been
+    am it its this that these those any very so such someone something somebody
+    having has have had do does did doing can could would should will shall may might must
+    i you he she we they me him her us them my your his our their who whom which what when where
+    how than then too also just quite rather really
+""".split())
+
+NEGATIONS = frozenset(['not', 'no', 'never', 'non', 'without'])
+
+# Words that reverse or weaken a definition: "lack of two chambers", "less than obsolete"
+CONTRASTS = frozenset([
+    'opposite', 'opposites', 'lack', 'lacks', 'lacking', 'less', 'least', 'fewer', 'absence', 'absent',
+    'unlike', 'contrary', 'reverse', 'inverse', 'anti', 'neither', 'nor', 'instead', 'except', 'barely',
+])
+
+# A typo-tolerant match must not pair "helpful" with "unhelpful"
+NEGATING_PREFIXES = ('un', 'dis', 'anti', 'non', 'in', 'im', 'il', 'ir', 'mis')
+
+# Normalized answers that mean "I don't know" and are never correct
+NON_ANSWERS = frozenset([
+    'idk', 'i dont know', 'i do not know', 'dont know', 'do not know', 'no idea', 'not sure',
+    'dunno', 'no clue', 'pass', 'skip', 'nothing', 'none',
+])
+
+_SUFFIXES = ('ational', 'ization', 'fulness', 'ousness', 'iveness', 'ingly', 'edly', 'ness',
+             'ment', 'ing', 'ies', 'ied', 'ed', 'ly', 'es', 's')
+
+
+@functools.lru_cache(maxsize=65536)
+def stem(token):
+    """Light suffix-stripping stemmer; good enough to match plurals and verb forms."""
+    if len(token) <= 3:
+        return token
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            if suffix in ('ies', 'ied'):
+                token += 'y'
+            break
+    if len(token) > 4 and token.endswith('e'):
+        token = token[:-1]
+    return token
+
+
+def normalize(text):
+    """Lowercase, drop apostrophes and punctuation, collapse whitespace."""
+    text = text.lower().replace("'", '').replace('’', '')
+    return ' '.join(re.findall(r'[a-z0-9]+', text))
+
+
+def content_stems(text):
+    """Stems of the non-stopword tokens of `text`, in order."""
+    return [stem(token) for token in normalize(text).split() if token not in STOPWORDS]
+
+
+def within_edit_distance(a, b, max_distance):
+    """True if the Levenshtein distance between a and b is at most max_distance."""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return False
+        previous = current
+    return previous[-1] <= max_distance
+
+
+def _typo_budget(token):
+    return 0 if len(token) < 5 else 1 if len(token) < 8 else 2
+
+
+def _negated(a, b):
+    """True if one stem is the other with a negating prefix ("unhelpful" / "helpful")."""
+    if len(a) < len(b):
+        a, b = b, a
+    return any(a.startswith(prefix) and a[len(prefix):] == b for prefix in NEGATING_PREFIXES)
+
+
+def _matches(def_stem, answer_stems):
+    if def_stem in answer_stems:
+        return True
+    budget = _typo_budget(def_stem)
+    return budget > 0 and any(within_edit_distance(def_stem, s, budget) and not _negated(def_stem, s)
+                              for s in answer_stems)
+
+
+def _contrasts(text):
+    return frozenset(token for token in normalize(text).split() if token in CONTRASTS)
+
+
+class LexicalGrader:
+    """Pre-grader over an index of definition stems built once from the word list."""
+
+    def __init__(self, definitions, max_extra_tokens=0, offline_coverage=0.6):
+        self.max_extra_tokens = max_extra_tokens  # Answer words outside the definition allowed on a full match
+        self.offline_coverage = offline_coverage  # Share of definition words needed when no LLM is available
+        self._index = {definition: self._entry(definition) for definition in definitions}
+        self._lock = threading.Lock()
+        self.counts = collections.Counter()
+
+    @staticmethod
+    def _entry(definition):
+        return normalize(definition), frozenset(content_stems(definition)), _contrasts(definition)
+
+    @staticmethod
+    def _reverses(answer, answer_stems, entry):
+        _, def_stems, def_contrasts = entry
+        return ((answer_stems & NEGATIONS) != (def_stems & NEGATIONS) or _contrasts(answer) != def_contrasts or
+                any(_negated(answer_stem, def_stem) for answer_stem in answer_stems for def_stem in def_stems))
+
+    def reverses(self, answer, definition):
+        """True if the answer may turn the definition around ("not deep", "lack of X", "unhelpful").
+
+        That is, its negations or contrast words differ from the definition's,
+        or it puts a negating prefix on one of the definition's words.
+        """
+        entry = self._index.get(definition) or self._entry(definition)
+        return self._reverses(answer, set(content_stems(answer)), entry)
+
+    def _score(self, answer, definition):
+        """Returns (verdict or None, coverage of definition stems)."""
+        entry = self._index.get(definition) or self._entry(definition)
+        def_normalized, def_stems, def_contrasts = entry
+        answer_normalized = normalize(answer)
+        if answer_normalized == def_normalized:
+            return True, 1.0
+        if not answer_normalized or answer_normalized in NON_ANSWERS:
+            return False, 0.0
+        answer_stems = set(content_stems(answer))
+        if not answer_stems:
+            return None, 0.0  # Only stopwords, e.g. "so"; too short to judge here
+        if not def_stems:
+            return None, 0.0
+        if self._reverses(answer, answer_stems, entry):
+            # "not deep" and "the opposite of deep" share every word with "deep" but mean the opposite
+            return None, 0.0
+        matched = sum(1 for def_stem in def_stems if _matches(def_stem, answer_stems))
+        coverage = matched / len(def_stems)
+        extra = sum(1 for answer_stem in answer_stems if not _matches(answer_stem, def_stems))
+        if coverage == 1.0 and extra <= self.max_extra_tokens:
+            return True, coverage
+        return None, coverage
+
+    def grade(self, answer, definition, offline=False):
+        """True/False for obvious cases, None if uncertain.
+
+        With offline=True (no LLM reachable) uncertain answers are decided by
+        definition-word coverage instead, so the answer is always True/False.
+        """
+        verdict, coverage = self._score(answer, definition)
+        if verdict is None and offline:
+            verdict = coverage >= self.offline_coverage
+            outcome = 'offline_accepted' if verdict else 'offline_rejected'
+        else:
+            outcome = {True: 'accepted', False: 'rejected', None: 'escalated'}[verdict]
+        with self._lock:
+            self.counts[outcome] += 1
+        return verdict
+
+    def stats(self):
+        with self._lock:
+            return {
+                'definitions': len(self._index),
+                'accepted': self.counts['accepted'],
+                'rejected': self.counts['rejected'],
+                'escalated': self.counts['escalated'],
+                'offline_accepted': self.counts['offline_accepted'],
+                'offline_rejected': self.counts['offline_rejected'],
+            }
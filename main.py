@@ -1,20 +1,80 @@
-word_scores = {}
-math_scores = {}
-
 import os
 import json
 import random
 import subprocess
 import argparse
-import threading
 import socket
-from math import gcd
-from flask import Flask, render_template, jsonify, request
+import atexit
+import signal
+import sys
+import time
+from flask import Flask, render_template, jsonify, redirect, request, url_for
 import requests
+from score_store import SCHEDULES, open_score_store
+from ollama_service import (CircuitBreaker, ModelHeartbeat, ModelResolver, VerdictMeter, ask_verdict, chat_content, embed_texts,
+                            is_model_not_found, shared_client)
+from grade_cache import GradeCache
+from embedding_grader import EmbeddingGrader
+from lexical_grader import LexicalGrader
+from grading_jobs import GradingJobs, QueueFull
+from batch_grader import BatchGrader
+from distractors import DistractorIndex
+from word_scheduler import WordScheduler
+from question_pool import QuestionPools
+from math_questions import generate_math_questions
+from levels import LevelService
+from cat_images import CatImageIndex
+from thumbnails import FORMATS, Thumbnailer, file_version
 
 # Game configuration
 WORDS_FILE = "words.json"
 SCORES_FILE = "scores.json"
+SCORES_DB = "scores.db"
+SCORES_JOURNAL = "scores.journal"
+SCORES_SNAPSHOT = "scores.snapshot.json"
+SCORE_BACKEND = "sqlite"  # 'sqlite', 'journal' or 'json' (legacy whole-file scores.json)
+SCORE_FLUSH_INTERVAL = 2.0  # Seconds of answers that may be lost on a crash; 0 writes every answer through
+SCORE_FLUSH_MAX_DIRTY = 100  # Flush early once this many players have unsaved changes
+JOURNAL_COMPACT_EVERY = 1000  # Journal backend: fold the journal into a snapshot after this many records
+OLLAMA_MODEL = None  # Pin a grading model (e.g. "mistral:latest") to skip model discovery
+OLLAMA_MODEL_TTL = 300  # Seconds before the discovered model is re-checked in the background
+OLLAMA_KEEP_ALIVE = "30m"  # How long Ollama keeps the model loaded after the last request
+OLLAMA_PLAY_HOURS = (7, 21)  # Local hours [start, end) the heartbeat keeps the model loaded; None for always
+OLLAMA_HEARTBEAT_INTERVAL = 300  # Seconds between heartbeats; keep this below OLLAMA_KEEP_ALIVE
+GRADING_TIMEOUT = 10.0  # Seconds a grading call may take before the answer goes to multiple choice
+GRADING_SLOW_CALL = 6.0  # Grading calls slower than this count against the circuit breaker
+GRADING_BREAKER_FAILURES = 3  # Consecutive slow or failed calls that stop grading with the model
+GRADING_BREAKER_RESET = 30  # Seconds before a probe call checks whether the model has recovered
+GRADE_CACHE_FILE = "grade_cache.db"  # On-disk tier of the grading verdict cache
+GRADE_CACHE_SIZE = 10000  # Verdicts kept in the in-memory LRU tier
+EMBEDDING_MODEL = None  # e.g. "nomic-embed-text" enables the embedding fast-path grader (needs numpy)
+EMBEDDINGS_FILE = "definition_embeddings.npz"  # Cached definition embedding matrix
+EMBEDDING_ACCEPT_THRESHOLD = 0.80  # Cosine similarity at or above this is accepted without the LLM
+EMBEDDING_REJECT_THRESHOLD = 0.40  # At or below this is rejected without the LLM
+ASYNC_GRADING = True  # /api/answer returns a job id and the client polls; False grades inside the request
+GRADING_WORKERS = 8  # Threads grading answers in async mode; also bounds how many answers can share a batch
+GRADING_MAX_PENDING = 64  # Queued + running grading jobs before /api/answer answers 503
+GRADING_BATCH_WINDOW_MS = 30  # How long the first answer waits for others to share its LLM call
+GRADING_BATCH_MAX = 8  # Answers per batched grading prompt; 1 sends every answer on its own
+DISTRACTOR_CANDIDATES = 8  # Similar definitions kept per word; multiple-choice options are drawn from these
+WORD_SCHEDULER_PLAYERS = 256  # Players whose weakest-word heaps stay in memory
+WORD_SCHEDULER_ENTRIES = 2_000_000  # Deck words summed over those heaps; about 100 bytes each
+QUESTION_BATCH_MAX = 20  # Most questions one /api/questions request returns
+MATH_POOL_DEPTH = 200  # Ready-made math questions kept per grade
+MATH_POOL_BATCH = 100  # Questions generated per grade on each refill pass; batches are vectorized with numpy
+LEVEL_CACHE_SIZE = 4096  # (score, level types) pairs whose serialized levels are kept
+CATALOG_MAX_AGE = 365 * 86400  # Seconds browsers keep /api/catalog/<version>; a version's content never changes
+CAT_IMAGES_PER_BREED = 6  # Images /api/cat_images returns per breed
+CAT_IMAGE_CHECK_INTERVAL = 5.0  # Seconds before a breed's image directory is checked for new downloads
+CAT_IMAGE_BATCH_MAX = 100  # Most breeds one /api/cat_images/batch request may ask for
+THUMBNAIL_CACHE_DIR = "thumbnail_cache"  # Resized images made by /assets/thumb/ (needs Pillow)
+THUMBNAIL_WIDTHS = (160, 320, 480, 640, 960)  # Widths a thumbnail request is rounded up to
+THUMBNAIL_QUALITY = 80  # WebP/JPEG quality of the resized images
+ASSET_MAX_AGE = 365 * 86400  # Seconds browsers keep a versioned (?v=) thumbnail
+
+# Bump GRADING_PROMPT_VERSION whenever GRADING_PROMPT changes so cached verdicts are not reused
+GRADING_PROMPT = "Is the following answer similar in meaning to this definition?\nDefinition: {definition}\nAnswer: {answer}\nRespond with JSON: {{\"verdict\": \"yes\"}} or {{\"verdict\": \"no\"}}."
+GRADING_PROMPT_VERSION = 2
 
 # Name to grade mapping for math questions
 NAME_TO_GRADE = {
@@ -326,515 +386,233 @@ def get_level_types_for_user(player_name):
     """Get the level types a user should see. Returns list of level type strings."""
     return LEVEL_TYPE_CONFIG.get(player_name.lower(), ['chemistry', 'cat'])
 
+level_service = LevelService({'chemistry': PERIODIC_ELEMENTS, 'cat': CAT_BREEDS}, POINTS_PER_LEVEL, LEVEL_CACHE_SIZE,
+                             extras={'habitat': CAT_HABITAT_ITEMS})
+
 def get_element_level(score):
     """Get the element level based on score. Returns element info dict. Wraps around after all elements."""
-    total_elements = len(PERIODIC_ELEMENTS)
-    # Use modulo to wrap around: score 0-9 = element 0, score 10-19 = element 1, ..., score 118-127 = element 0 again
-    level_index = (score // POINTS_PER_LEVEL) % total_elements
-    element = PERIODIC_ELEMENTS[level_index].copy()
-    
-    # Calculate which cycle we're in (0 = first time through, 1 = second time, etc.)
-    cycle = (score // POINTS_PER_LEVEL) // total_elements
-    element['level'] = level_index + 1
-    element['cycle'] = cycle + 1  # Human-readable cycle number (1, 2, 3...)
-    
-    # Score required is the start of the current level within the current cycle
-    score_in_cycle = score % (POINTS_PER_LEVEL * total_elements)
-    score_required_in_cycle = (score_in_cycle // POINTS_PER_LEVEL) * POINTS_PER_LEVEL
-    element['score_required'] = score_required_in_cycle
-    
-    # Next level score (absolute) - calculate absolute score for next level
-    cycle_base_score = cycle * POINTS_PER_LEVEL * total_elements
-    element['next_level_score'] = cycle_base_score + score_required_in_cycle + POINTS_PER_LEVEL
-    
-    # Progress within current level (0.0 to 1.0)
-    progress_in_level = (score_in_cycle % POINTS_PER_LEVEL) / POINTS_PER_LEVEL
-    element['progress'] = progress_in_level
-    
-    return element
+    return level_service.level('chemistry', score)
 
 def get_cat_level(score):
     """Get the cat level based on score. Returns cat breed info dict. Wraps around after all breeds."""
-    total_breeds = len(CAT_BREEDS)
-    # Use modulo to wrap around: score 0-9 = breed 0, score 10-19 = breed 1, ..., score 200-209 = breed 0 again
-    breed_index = (score // POINTS_PER_LEVEL) % total_breeds
-    breed = CAT_BREEDS[breed_index].copy()
-    
-    # Calculate which cycle we're in (0 = first time through, 1 = second time, etc.)
-    cycle = (score // POINTS_PER_LEVEL) // total_breeds
-    breed['level'] = breed_index + 1
-    breed['cycle'] = cycle + 1  # Human-readable cycle number (1, 2, 3...)
-    
-    # Score required is the start of the current level within the current cycle
-    score_in_cycle = score % (POINTS_PER_LEVEL * total_breeds)
-    score_required_in_cycle = (score_in_cycle // POINTS_PER_LEVEL) * POINTS_PER_LEVEL
-    breed['score_required'] = score_required_in_cycle
-    
-    # Next level score (absolute) - calculate absolute score for next level
-    cycle_base_score = cycle * POINTS_PER_LEVEL * total_breeds
-    breed['next_level_score'] = cycle_base_score + score_required_in_cycle + POINTS_PER_LEVEL
-    
-    # Progress within current level (0.0 to 1.0)
-    progress_in_level = (score_in_cycle % POINTS_PER_LEVEL) / POINTS_PER_LEVEL
-    breed['progress'] = progress_in_level
-    
-    return breed
+    return level_service.level('cat', score)
+
+def get_levels(player_name, score):
+    """The levels and level types a player sees, as response fields. The levels dict is shared; don't modify it.
+
+    Each level is only its number, cycle and progress; clients look the
+    element or breed up in /api/catalog/<catalog>.
+    """
+    level_types = get_level_types_for_user(player_name)
+    return {'catalog': level_service.catalog_version, 'levels': level_service.levels(score, level_types),
+            'level_types': level_types}
+
+def level_response(body, player_name, score):
+    """jsonify(body) plus the player's levels, spliced in from the level service's cached JSON."""
+    fragment = level_service.fragment(score, get_level_types_for_user(player_name))
+    text = json.dumps(body, separators=(',', ':'), sort_keys=True)
+    return app.response_class(text[:-1] + (',' if body else '') + fragment + '}\n', mimetype=app.json.mimetype)
 
 # Core game logic functions (no I/O)
+shared_client.keep_alive = OLLAMA_KEEP_ALIVE
+shared_client.timeout = GRADING_TIMEOUT
+grading_breaker = CircuitBreaker(GRADING_BREAKER_FAILURES, GRADING_SLOW_CALL, GRADING_BREAKER_RESET)
+model_resolver = ModelResolver(ttl=OLLAMA_MODEL_TTL, pinned=OLLAMA_MODEL)
+model_heartbeat = ModelHeartbeat(shared_client, lambda: model_resolver.get(), OLLAMA_HEARTBEAT_INTERVAL,
+                                 OLLAMA_PLAY_HOURS)
+grade_cache = None  # Opened by init_services()
+verdict_meter = VerdictMeter()
+embedding_grader = None  # Set up by init_services() when an embedding model is configured
+lexical_grader = None  # Built from the word list below
+distractor_index = None  # Built from the word list below; rebuilt from embeddings once they are ready
+word_scheduler = None  # Built by init_services()
+
 def get_ollama_model():
-    """Get the best available Ollama model. Returns model name or None."""
-    import ollama
+    """Get the best available Ollama model (cached). Returns model name or None."""
+    return model_resolver.get()
+
+def ask_ollama_similarity(player_answer, correct_def, model_to_use, deadline=None):
+    """Ask the LLM whether the answer matches. Returns True/False, or None if the call failed or ran out of time.
+
+    `deadline` is a time.monotonic() value; without one the call gets GRADING_TIMEOUT.
+    """
     from ollama._types import ResponseError
     
+    budget = GRADING_TIMEOUT if deadline is None else deadline - time.monotonic()
+    if budget <= 0:
+        return None
     try:
-        models_response = ollama.list()
-        available_models = [m.model for m in models_response.models] if hasattr(models_response, 'models') else []
-        
-        if available_models:
-            model_names = ['mistral', 'llama2', 'llama3', 'phi', 'gemma']
-            found_model = None
-            
-            for model_name in model_names:
-                for available in available_models:
-                    if model_name in available.lower():
-                        found_model = available
-                        break
-                if found_model:
-                    break
-            
-            if found_model:
-                return found_model
-            else:
-                return available_models[0]
+        prompt = GRADING_PROMPT.format(definition=correct_def, answer=player_answer)
+        return ask_verdict(model_to_use, prompt, meter=verdict_meter, budget=budget)
+    
+    except ResponseError as e:
+        if is_model_not_found(e):
+            # Model was removed or renamed; rediscover on the next answer
+            model_resolver.invalidate()
+        return None
     except Exception:
         return None
-    
-    return None
+
+def create_batch_grader(max_batch=GRADING_BATCH_MAX):
+    """Coalesce concurrent LLM grading calls into batched prompts. Returns None when disabled."""
+    if max_batch <= 1:
+        return None
+    return BatchGrader(lambda model, prompt, schema: chat_content(model, prompt, format=schema),
+                       ask_ollama_similarity, GRADING_BATCH_WINDOW_MS / 1000, max_batch)
+
+batch_grader = None  # Started by init_services(); stays None when batching is off
+
+def ask_model(player_answer, correct_def, model_to_use):
+    """LLM verdict through the circuit breaker. None if the model was skipped, failed or timed out.
+
+    The whole call, batching and any serial fallback included, gets one
+    GRADING_TIMEOUT budget.
+    """
+    if not grading_breaker.allow():
+        return None
+    start = time.monotonic()
+    deadline = start + GRADING_TIMEOUT
+    verdict = None
+    try:
+        if batch_grader is not None:
+            verdict = batch_grader.grade(player_answer, correct_def, model_to_use, deadline)
+        else:
+            verdict = ask_ollama_similarity(player_answer, correct_def, model_to_use, deadline)
+    finally:
+        grading_breaker.record(verdict is not None, time.monotonic() - start)
+    return verdict
 
 def is_similar_to_definition(player_answer, correct_def):
-    import ollama
-    from ollama._types import ResponseError
+    """True/False, or None when the answer could not be graded (model down, stalled or breaker open)."""
+    # Obvious matches and non-answers are decided offline in microseconds
+    verdict = lexical_grader.grade(player_answer, correct_def)
+    if verdict is not None:
+        return verdict
     
     model_to_use = get_ollama_model()
     if not model_to_use:
-        return False
+        # Ollama is down: accept clear word-overlap matches, leave the rest to multiple choice
+        return lexical_grader.grade(player_answer, correct_def, offline=True) or None
     
-    try:
-        prompt = f"Is the following answer similar in meaning to this definition?\nDefinition: {correct_def}\nAnswer: {player_answer}\nRespond only with 'yes' or 'no'."
-        response = ollama.chat(model=model_to_use, messages=[{"role": "user", "content": prompt}])
-        return 'yes' in response['message']['content'].lower()
+    cached = grade_cache.get(player_answer, correct_def, model_to_use, GRADING_PROMPT_VERSION)
+    if cached is not None:
+        return cached
     
-    except ResponseError:
-        return False
-    except Exception:
-        return False
-
-def warmup_ollama():
-    """Warm up the Ollama model with a simple request to reduce first-request latency."""
-    def _warmup():
-        import ollama
-        from ollama._types import ResponseError
-        
-        try:
-            model_to_use = get_ollama_model()
-            if model_to_use:
-                # Make a simple warmup request
-                ollama.chat(model=model_to_use, messages=[{"role": "user", "content": "Say 'yes'"}])
-        except Exception:
-            # Silently fail - warmup is optional
-            pass
+    # Clear accepts and rejects by embedding similarity; only the ambiguous band reaches the chat model.
+    # Negated or contrasted answers embed close to the definition, so they never get a fast accept
+    if embedding_grader is not None:
+        verdict = embedding_grader.grade(player_answer, correct_def,
+                                         can_accept=not lexical_grader.reverses(player_answer, correct_def))
+        if verdict is not None:
+            return verdict
     
-    # Run warmup in background thread to not block
-    thread = threading.Thread(target=_warmup, daemon=True)
-    thread.start()
+    verdict = ask_model(player_answer, correct_def, model_to_use)
+    if verdict is None:
+        # Don't cache failures; the next attempt may reach the model
+        return lexical_grader.grade(player_answer, correct_def, offline=True) or None
+    grade_cache.put(player_answer, correct_def, model_to_use, GRADING_PROMPT_VERSION, verdict)
+    return verdict
 
 def load_words():
     with open(WORDS_FILE, "r") as f:
         return json.load(f)
 
-def load_scores():
-    global word_scores, math_scores
-    if not os.path.exists(SCORES_FILE):
-        return {}
-    with open(SCORES_FILE, "r") as f:
-        data = json.load(f)
-        word_scores = data.get('word_scores', {})
-        math_scores = data.get('math_scores', {})
-        return data
-
-def save_scores(scores):
-    global word_scores, math_scores
-    with open(SCORES_FILE, "w") as f:
-        json.dump({**scores, 'word_scores': word_scores, 'math_scores': math_scores}, f)
-        f.write('\n')
-
 def check_answer(player_name, word, player_answer, correct_def, words):
     """Check if answer is correct. Returns (is_correct, points, message, show_mc, mc_options, correct_index)"""
-    global word_scores
-    
     if player_answer.lower() == word.lower():
         return (False, 0, "❌ Try defining the word, not repeating it!", False, None, None)
     
-    # Load scores first to get current state
-    scores = load_scores()
-    user_scores = word_scores.setdefault(player_name, {})
-    
     # Check if answer matches definition
-    if len(player_answer.lower()) > 2 and (player_answer.lower() == correct_def.lower() or is_similar_to_definition(player_answer, correct_def)):
-        user_scores[word] = user_scores.get(word, 0) + 3
-        scores[player_name] = scores.get(player_name, 0) + 3
-        save_scores(scores)
+    if len(player_answer.lower()) <= 2:
+        verdict = False
+    elif player_answer.lower() == correct_def.lower():
+        verdict = True
+    else:
+        verdict = is_similar_to_definition(player_answer, correct_def)
+    if verdict:
+        score_store.record_answer(player_name, 'text', 3, word)
+        word_scheduler.record(player_name, word, 3, 'correct')
         return (True, 3, f"✅ +3 points  [{correct_def}]", False, None, None)
     
-    # Generate multiple choice options
-    options = [correct_def]
-    all_defs = [w["definition"] for w in words if w["definition"] != correct_def]
-    options += random.sample(all_defs, k=min(3, len(all_defs)))
+    if verdict is None:
+        # Grading is unavailable; don't count the answer as wrong, let the player pick instead
+        message = "Couldn't check your answer right now. Choose the correct definition:"
+    else:
+        # Wrong free-text answers change no score but are kept in the answer history
+        score_store.record_answer(player_name, 'text', 0, word)
+        message = "Incorrect. Choose the correct definition:"
+    
+    # Generate multiple choice options from the precomputed similar definitions
+    options = [correct_def] + distractor_index.options(correct_def)
     random.shuffle(options)
     correct_index = options.index(correct_def)
     
-    return (False, 0, "Incorrect. Choose the correct definition:", True, options, correct_index)
+    return (False, 0, message, True, options, correct_index)
 
 def check_mc_answer(player_name, word, selected_index, correct_index, correct_def):
     """Check multiple choice answer. Returns (is_correct, points, message)"""
-    global word_scores
-    
-    # Load scores first to get current state
-    scores = load_scores()
-    user_scores = word_scores.setdefault(player_name, {})
-    
     if selected_index == correct_index:
-        user_scores[word] = user_scores.get(word, 0) + 1
-        scores[player_name] = scores.get(player_name, 0) + 1
-        save_scores(scores)
+        score_store.record_answer(player_name, 'mc', 1, word)
+        word_scheduler.record(player_name, word, 1, 'partial')
         return (True, 1, "✅ +1 point")
     else:
-        user_scores[word] = user_scores.get(word, 0)
-        save_scores(scores)
+        # Record the word as seen so it stops sorting ahead of unseen words
+        score_store.record_answer(player_name, 'mc', 0, word)
+        word_scheduler.record(player_name, word, 0, 'wrong')
         return (False, 0, f"❌ The correct answer was: {correct_def}")
 
+def get_next_words(player_name, words, count):
+    """Get the next `count` distinct words to quiz, in the order to ask them."""
+    if words is word_scheduler.deck:
+        return word_scheduler.upcoming(player_name, count, 10)
+    weakest_words = score_store.weakest_words(player_name, words, max(10, count))
+    random.shuffle(weakest_words)
+    return weakest_words[:count]
+
 def get_next_word(player_name, words):
     """Get the next word to quiz. Returns word_info dict."""
-    global word_scores
-    user_word_scores = word_scores.get(player_name, {})
-    
-    sorted_words = sorted(words, key=lambda w: user_word_scores.get(w['word'], -float('inf')))
-    weakest_words = sorted_words[:10]
-    random.shuffle(weakest_words)
-    return weakest_words[0]
+    return get_next_words(player_name, words, 1)[0]
+
+def word_question(word_info):
+    """A word question with its multiple-choice options already drawn, for clients that prefetch."""
+    options = [word_info['definition']] + distractor_index.options(word_info['definition'])
+    random.shuffle(options)
+    return {
+        'word': word_info['word'],
+        'definition': word_info['definition'],
+        'options': options,
+        'correct_index': options.index(word_info['definition'])
+    }
 
 def get_player_score(player_name, game_type='words'):
     """Get player's current score for the given game type."""
-    scores = load_scores()
-    if game_type == 'math':
-        # Math scores are stored separately in math_scores dict
-        return math_scores.get(player_name, 0)
-    # Word scores are stored in the main scores dict
-    return scores.get(player_name, 0)
+    return score_store.get_score(player_name, game_type)
 
 # Math question generation functions
 def get_grade_for_name(name):
     """Get grade level for a given name."""
     return NAME_TO_GRADE.get(name.lower(), 5)  # Default to grade 5
 
-def normalize_value(value_str):
-    """
-    Convert a value string (integer or fraction) to a normalized tuple for comparison.
-    Returns (numerator, denominator) tuple where the fraction is in simplest form.
-    For integers, returns (value, 1).
-    """
-    if isinstance(value_str, (int, float)):
-        value_str = str(int(value_str))
-    
-    if '/' in value_str:
-        try:
-            num_str, den_str = value_str.split('/')
-            num = int(num_str)
-            den = int(den_str)
-            if den == 0:
-                return (num, den)  # Invalid, but return as-is
-            # Simplify the fraction
-            g = gcd(abs(num), abs(den))
-            num = num // g
-            den = den // g
-            # Normalize sign (keep sign in numerator)
-            if den < 0:
-                num = -num
-                den = -den
-            return (num, den)
-        except (ValueError, ZeroDivisionError):
-            return value_str  # Return as-is if can't parse
-    else:
-        try:
-            num = int(value_str)
-            return (num, 1)
-        except ValueError:
-            return value_str  # Return as-is if can't parse
-
-def generate_math_question(grade):
-    """Generate a math question appropriate for the given grade level. Returns (question, correct_answer, options)."""
-    max_attempts = 50  # Prevent infinite loops
-    
-    if grade <= 2:
-        # Grade 2: Simple addition/subtraction within 20
-        a = random.randint(1, 10)
-        b = random.randint(1, 10)
-        op = random.choice(['+', '-'])
-        if op == '+':
-            correct = a + b
-            question = f"{a} + {b} = ?"
-        else:
-            # Ensure non-negative result
-            if a < b:
-                a, b = b, a
-            correct = a - b
-            question = f"{a} - {b} = ?"
-        
-        # Generate wrong answers, ensuring uniqueness
-        wrong1 = correct + random.randint(1, 5)
-        wrong2 = correct - random.randint(1, 5) if correct > 1 else correct + random.randint(6, 10)
-        wrong3 = correct + random.randint(-3, 3)
-        attempts = 0
-        while (wrong3 == correct or wrong3 == wrong1 or wrong3 == wrong2 or wrong3 < 0) and attempts < max_attempts:
-            wrong3 = correct + random.randint(-3, 3)
-            attempts += 1
-        
-        # Ensure wrong1 and wrong2 are different
-        attempts = 0
-        while wrong1 == wrong2 and attempts < max_attempts:
-            wrong2 = correct - random.randint(1, 5) if correct > 1 else correct + random.randint(6, 10)
-            attempts += 1
-        
-    elif grade <= 5:
-        # Grade 5: Addition/subtraction with larger numbers, simple multiplication
-        op = random.choice(['+', '-', '*'])
-        if op == '+':
-            a = random.randint(10, 100)
-            b = random.randint(10, 100)
-            correct = a + b
-            question = f"{a} + {b} = ?"
-        elif op == '-':
-            a = random.randint(50, 200)
-            b = random.randint(10, a)
-            correct = a - b
-            question = f"{a} - {b} = ?"
-        else:  # multiplication
-            a = random.randint(2, 12)
-            b = random.randint(2, 12)
-            correct = a * b
-            question = f"{a} × {b} = ?"
-        
-        # Generate wrong answers, ensuring uniqueness
-        wrong1 = correct + random.randint(5, 15)
-        wrong2 = correct - random.randint(5, 15) if correct > 10 else correct + random.randint(16, 25)
-        wrong3 = correct + random.randint(-10, 10)
-        attempts = 0
-        while (wrong3 == correct or wrong3 == wrong1 or wrong3 == wrong2 or wrong3 < 0) and attempts < max_attempts:
-            wrong3 = correct + random.randint(-10, 10)
-            attempts += 1
-        
-        # Ensure wrong1 and wrong2 are different
-        attempts = 0
-        while wrong1 == wrong2 and attempts < max_attempts:
-            wrong2 = correct - random.randint(5, 15) if correct > 10 else correct + random.randint(16, 25)
-            attempts += 1
-    
-    else:  # Grade 12
-        # Grade 12: Algebra, fractions, more complex operations
-        question_type = random.choice(['algebra', 'fraction', 'exponent', 'sqrt'])
-        
-        if question_type == 'algebra':
-            # Simple linear equation: ax + b = c, solve for x
-            x_val = random.randint(1, 10)
-            a = random.randint(2, 5)
-            b = random.randint(1, 10)
-            c = a * x_val + b
-            correct = x_val
-            question = f"If {a}x + {b} = {c}, what is x?"
-            wrong1 = x_val + random.randint(1, 3)
-            wrong2 = x_val - random.randint(1, 3) if x_val > 2 else x_val + random.randint(4, 6)
-            wrong3 = (c - b) // a + random.randint(-2, 2)
-            attempts = 0
-            while (wrong3 == correct or wrong3 == wrong1 or wrong3 == wrong2 or wrong3 <= 0) and attempts < max_attempts:
-                wrong3 = (c - b) // a + random.randint(-2, 2)
-                attempts += 1
-            
-            # Ensure wrong1 and wrong2 are different
-            attempts = 0
-            while wrong1 == wrong2 and attempts < max_attempts:
-                wrong2 = x_val - random.randint(1, 3) if x_val > 2 else x_val + random.randint(4, 6)
-                attempts += 1
-        
-        elif question_type == 'fraction':
-            # Simple fraction addition/subtraction
-            num1 = random.randint(1, 5)
-            den1 = random.randint(2, 6)
-            num2 = random.randint(1, 5)
-            den2 = random.randint(2, 6)
-            # For simplicity, use common denominator
-            common_den = den1 * den2
-            sum_num = num1 * den2 + num2 * den1
-            # Simplify (basic)
-            g = gcd(sum_num, common_den)
-            correct_num = sum_num // g
-            correct_den = common_den // g
-            correct = f"{correct_num}/{correct_den}"
-            question = f"{num1}/{den1} + {num2}/{den2} = ?"
-            
-            # Generate wrong answers as fractions, ensuring they're numerically different
-            wrong_answers = []
-            seen_values = {normalize_value(correct)}  # Track normalized values, not strings
-            
-            attempts = 0
-            while len(wrong_answers) < 3 and attempts < max_attempts:
-                # Generate candidate wrong answers
-                candidates = [
-                    f"{sum_num + random.randint(1, 3)}/{common_den}",  # Modified numerator
-                    f"{sum_num}/{common_den + random.randint(1, 3)}",  # Modified denominator
-                    f"{num1 + num2}/{den1 + den2}",  # Incorrect addition
-                    f"{random.randint(1, 20)}/{random.randint(2, 20)}"  # Random fraction
-                ]
-                
-                for candidate in candidates:
-                    normalized = normalize_value(candidate)
-                    if normalized not in seen_values:
-                        wrong_answers.append(candidate)
-                        seen_values.add(normalized)
-                        if len(wrong_answers) == 3:
-                            break
-                
-                # If still need more, generate random fractions
-                if len(wrong_answers) < 3:
-                    new_wrong = f"{random.randint(1, 30)}/{random.randint(2, 30)}"
-                    normalized = normalize_value(new_wrong)
-                    if normalized not in seen_values:
-                        wrong_answers.append(new_wrong)
-                        seen_values.add(normalized)
-                
-                attempts += 1
-            
-            # Ensure we have 3 wrong answers
-            while len(wrong_answers) < 3:
-                new_wrong = f"{random.randint(1, 30)}/{random.randint(2, 30)}"
-                normalized = normalize_value(new_wrong)
-                if normalized not in seen_values:
-                    wrong_answers.append(new_wrong)
-                    seen_values.add(normalized)
-            
-            wrong1, wrong2, wrong3 = wrong_answers[0], wrong_answers[1], wrong_answers[2]
-        
-        elif question_type == 'exponent':
-            base = random.randint(2, 5)
-            exp = random.randint(2, 4)
-            correct = base ** exp
-            question = f"{base}²" if exp == 2 else f"{base}³" if exp == 3 else f"{base}^{exp}"
-            wrong1 = base * exp
-            wrong2 = base + exp
-            wrong3 = (base + 1) ** exp
-            
-            # Ensure uniqueness
-            attempts = 0
-            while (wrong1 == correct or wrong2 == correct or wrong3 == correct or
-                   wrong1 == wrong2 or wrong1 == wrong3 or wrong2 == wrong3) and attempts < max_attempts:
-                wrong1 = base * exp + random.randint(-2, 2)
-                wrong2 = base + exp + random.randint(-2, 2)
-                wrong3 = (base + random.randint(-1, 2)) ** exp
-                attempts += 1
-        
-        else:  # sqrt
-            num = random.choice([4, 9, 16, 25, 36, 49, 64, 81, 100])
-            correct = int(num ** 0.5)
-            question = f"√{num} = ?"
-            wrong1 = correct + 1
-            wrong2 = correct - 1 if correct > 1 else correct + 2
-            wrong3 = correct + 2
-            
-            # Ensure uniqueness
-            attempts = 0
-            while (wrong1 == wrong2 or wrong1 == wrong3 or wrong2 == wrong3) and attempts < max_attempts:
-                wrong2 = correct - 1 if correct > 1 else correct + 2
-                wrong3 = correct + random.randint(2, 3)
-                attempts += 1
-    
-    # Create options list and ensure all are numerically unique
-    options = [str(correct), str(wrong1), str(wrong2), str(wrong3)]
-    
-    # Final check: ensure all options are numerically unique (not just string unique)
-    seen_normalized = set()
-    unique_options = []
-    
-    for opt in options:
-        normalized = normalize_value(opt)
-        if normalized not in seen_normalized:
-            unique_options.append(opt)
-            seen_normalized.add(normalized)
-    
-    # If we have duplicates by value, regenerate wrong answers
-    if len(unique_options) < 4:
-        attempts = 0
-        seen_normalized = {normalize_value(str(correct))}  # Start with correct answer
-        unique_options = [str(correct)]
-        
-        is_fraction = isinstance(correct, str) and '/' in str(correct)
-        
-        while len(unique_options) < 4 and attempts < max_attempts * 2:  # More attempts for final check
-            if is_fraction:  # Fraction case
-                # For fractions, generate new wrong answers that are numerically different
-                candidate = f"{random.randint(1, 30)}/{random.randint(2, 30)}"
-                normalized = normalize_value(candidate)
-                if normalized not in seen_normalized:
-                    unique_options.append(candidate)
-                    seen_normalized.add(normalized)
-            else:  # Integer case
-                if grade <= 2:
-                    candidate = int(correct) + random.randint(-10, 10)
-                elif grade <= 5:
-                    candidate = int(correct) + random.randint(-20, 20)
-                else:
-                    candidate = int(correct) + random.randint(-10, 10)
-                if candidate > 0:
-                    normalized = normalize_value(str(candidate))
-                    if normalized not in seen_normalized:
-                        unique_options.append(str(candidate))
-                        seen_normalized.add(normalized)
-            attempts += 1
-        
-        # Ensure we have at least 4 options (use original if needed, but prefer unique)
-        if len(unique_options) >= 2:
-            options = unique_options
-        # If we still don't have 4, we'll use what we have (shouldn't happen often)
-    
-    random.shuffle(options)
-    correct_index = options.index(str(correct))
-    
-    return {
-        'question': question,
-        'correct_answer': str(correct),
-        'options': options,
-        'correct_index': correct_index
-    }
+def create_question_pools(depth=MATH_POOL_DEPTH):
+    """Per-grade pools of ready-made math questions."""
+    return QuestionPools(generate_math_questions, depth, MATH_POOL_BATCH)
+
+question_pools = None  # Built by init_services()
 
 def get_next_math_question(player_name):
     """Get the next math question for a player based on their grade."""
     grade = get_grade_for_name(player_name)
-    return generate_math_question(grade)
+    return question_pools.get(grade)
 
 def check_math_answer(player_name, selected_index, correct_index, correct_answer):
     """Check math multiple choice answer. Returns (is_correct, points, message)"""
-    global math_scores
-    
-    scores = load_scores()
-    
     if selected_index == correct_index:
-        # Update math score separately (just one total score per player)
-        math_scores[player_name] = math_scores.get(player_name, 0) + 3
-        save_scores(scores)
+        # Math keeps just one total score per player
+        score_store.record_answer(player_name, 'math', 3)
         return (True, 3, "✅ +3 points")
     else:
-        # Ensure math_scores entry exists even for incorrect answers
-        if player_name not in math_scores:
-            math_scores[player_name] = 0
-        save_scores(scores)
+        # Also creates the math score entry for a first, incorrect answer
+        score_store.record_answer(player_name, 'math', 0)
         return (False, 0, f"❌ The correct answer was: {correct_answer}")
 
 # CLI interface functions
@@ -893,35 +671,124 @@ def launch_bonus_game_cli():
 
 def game_loop_cli(player_name, words, games_enabled=False):
     """CLI game loop."""
-    scores = load_scores()
-    if player_name not in scores:
-        scores[player_name] = 0
+    score_store.ensure_player(player_name)
     
     while True:
         word_info = get_next_word(player_name, words)
-        points = ask_question_cli(word_info["word"], word_info["definition"], words, player_name)
-        scores[player_name] += points
-        save_scores(scores)
-        print(f"Total score: {scores[player_name]}")
+        ask_question_cli(word_info["word"], word_info["definition"], words, player_name)
+        total = get_player_score(player_name)
+        print(f"Total score: {total}")
         
-        if games_enabled and scores[player_name] >= 50 and scores[player_name] % 20 < 5:
+        if games_enabled and total >= 50 and total % 20 < 5:
             cost = launch_bonus_game_cli()
-            scores[player_name] -= cost
+            if cost:
+                score_store.add_score(player_name, -cost)
 
 # Flask web interface
 from pathlib import Path
-from flask import send_from_directory
+from flask import abort, send_file, send_from_directory
 
 app = Flask(__name__)
 words = load_words()
+lexical_grader = LexicalGrader([w['definition'] for w in words])
+distractor_index = DistractorIndex([w['definition'] for w in words], DISTRACTOR_CANDIDATES)
+
+def use_embedding_distractors(grader):
+    """Swap in distractors ranked by definition embeddings once the grader's matrix is built."""
+    global distractor_index
+    distractor_index = DistractorIndex(grader.definitions, DISTRACTOR_CANDIDATES, grader.matrix)
+
+def create_embedding_grader(model):
+    """Build the embedding fast-path grader in the background. Returns None when disabled."""
+    if not model:
+        return None
+    # Building the matrix may include a cold load; embedding one answer must stay within the grading timeout
+    grader = EmbeddingGrader(lambda texts: embed_texts(model, texts, bounded=len(texts) == 1), model,
+                             [w['definition'] for w in words],
+                             EMBEDDING_ACCEPT_THRESHOLD, EMBEDDING_REJECT_THRESHOLD, EMBEDDINGS_FILE)
+    grader.build_async(on_ready=use_embedding_distractors)
+    return grader
+
+def create_score_store(backend=SCORE_BACKEND, flush_interval=SCORE_FLUSH_INTERVAL):
+    """Open the configured score store."""
+    return open_score_store(backend, SCORES_FILE, SCORES_DB, flush_interval, SCORE_FLUSH_MAX_DIRTY,
+                            journal_path=SCORES_JOURNAL, snapshot_path=SCORES_SNAPSHOT,
+                            compact_every=JOURNAL_COMPACT_EVERY)
+
+def create_word_scheduler(store):
+    """Next-word selection for the word deck, backed by `store`."""
+    return WordScheduler(words, store, WORD_SCHEDULER_PLAYERS, WORD_SCHEDULER_ENTRIES)
+
+score_store = None  # Opened by init_services()
+
+def close_score_store():
+    """Flush pending score writes on shutdown."""
+    score_store.close()
+
+def init_services(score_backend=SCORE_BACKEND, flush_interval=SCORE_FLUSH_INTERVAL,
+                  grading_batch=GRADING_BATCH_MAX, embedding_model=EMBEDDING_MODEL, math_pool_depth=MATH_POOL_DEPTH):
+    """Open the score store and grade cache, index the assets and start the background workers.
+
+    Importing this module only reads the word and breed lists; it writes
+    nothing, scans no asset directories and starts no threads. The command
+    line calls this once its options are parsed. Anything else serving `app`
+    (e.g. a test client) must call it first.
+    """
+    global score_store, word_scheduler, grade_cache, batch_grader, embedding_grader, question_pools, grading_jobs
+    global cat_image_index, thumbnailer
+    grade_cache = GradeCache(GRADE_CACHE_FILE, GRADE_CACHE_SIZE)
+    batch_grader = create_batch_grader(grading_batch)
+    embedding_grader = create_embedding_grader(embedding_model)
+    question_pools = create_question_pools(math_pool_depth)
+    grading_jobs = GradingJobs(GRADING_WORKERS, GRADING_MAX_PENDING)
+    score_store = create_score_store(score_backend, flush_interval)
+    word_scheduler = create_word_scheduler(score_store)
+    cat_image_index = CatImageIndex('assets/cat_images', '/assets/cat_images', CAT_IMAGES_PER_BREED, CAT_IMAGE_CHECK_INTERVAL)
+    thumbnailer = Thumbnailer('assets', THUMBNAIL_CACHE_DIR, THUMBNAIL_WIDTHS, THUMBNAIL_QUALITY)
+    atexit.register(close_score_store)
 
 # Serve static files from assets directory
+cat_image_index = None  # Built by init_services()
+
+thumbnailer = None  # Built by init_services()
+
 @app.route('/assets/<path:filename>')
 def serve_assets(filename):
     """Serve static assets like cat images."""
     assets_dir = Path('assets')
     return send_from_directory(str(assets_dir), filename)
 
+@app.route('/assets/thumb/<int:width>/<path:filename>')
+def serve_thumbnail(width, filename):
+    """A copy of an asset image at most `width` pixels wide: WebP if the browser takes it, otherwise JPEG.
+
+    ?format=webp|jpeg overrides the choice. With ?v=<current version of the
+    source> (as in /api/cat_images URLs) the response is cached for good;
+    otherwise it is revalidated through its ETag. Without Pillow the
+    original file is served.
+    """
+    source = thumbnailer.source(filename)
+    if source is None:
+        abort(404)
+    if not thumbnailer.available:
+        return serve_assets(filename)
+    fmt = request.args.get('format') or thumbnailer.pick_format(request.accept_mimetypes['image/webp'] > 0)
+    if fmt not in thumbnailer.formats:
+        return jsonify({'error': 'format must be one of: ' + ', '.join(thumbnailer.formats)}), 400
+    try:
+        path, etag = thumbnailer.derivative(source, width, fmt)
+    except (OSError, ValueError):
+        abort(404)  # Not an image Pillow can read
+    response = send_file(os.path.abspath(path), mimetype=FORMATS[fmt], etag=etag, conditional=True)
+    if 'format' not in request.args:
+        response.vary.add('Accept')
+    if request.args.get('v') == file_version(os.stat(source)):
+        response.cache_control.no_cache = None  # send_file's default
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
 @app.route('/')
 def index():
     return render_template('word_quest.html')
@@ -938,39 +805,35 @@ def start_game():
     if game_type not in ['words', 'math']:
         return jsonify({'error': 'Invalid game type. Must be "words" or "math"'}), 400
     
-    scores = load_scores()
-    
     # Initialize scores based on game type
-    if game_type == 'math':
-        if player_name not in math_scores:
-            math_scores[player_name] = 0
-        current_score = math_scores[player_name]
-    else:
-        if player_name not in scores:
-            scores[player_name] = 0
-        current_score = scores[player_name]
-    
-    save_scores(scores)
+    current_score = score_store.ensure_player(player_name, game_type)
     
-    # Warm up Ollama model in background to reduce first-request latency (only for words)
+    # Make sure the grading model is loaded before the first answer arrives (only for words)
     if game_type == 'words':
-        warmup_ollama()
-    
-    # Get level types for this user
-    level_types = get_level_types_for_user(player_name)
-    levels = {}
-    if 'chemistry' in level_types:
-        levels['chemistry'] = get_element_level(current_score)
-    if 'cat' in level_types:
-        levels['cat'] = get_cat_level(current_score)
+        model_heartbeat.poke()
     
-    return jsonify({
+    return level_response({
         'status': 'started',
         'score': current_score,
         'game_type': game_type,
-        'levels': levels,
-        'level_types': level_types
-    })
+        'schedule': word_scheduler.get_schedule(player_name)
+    }, player_name, current_score)
+
+@app.route('/api/schedule', methods=['POST'])
+def set_schedule():
+    """Switch a player between weakest-words practice and Leitner spaced repetition."""
+    data = request.json
+    player_name = data.get('name', '').strip().lower()
+    mode = data.get('mode', '').strip().lower()
+    
+    if not player_name:
+        return jsonify({'error': 'Name required'}), 400
+    
+    if mode not in SCHEDULES:
+        return jsonify({'error': 'Invalid schedule. Must be one of: ' + ', '.join(SCHEDULES)}), 400
+    
+    word_scheduler.set_schedule(player_name, mode)
+    return jsonify({'status': 'ok', 'schedule': mode})
 
 @app.route('/api/question', methods=['GET'])
 def get_question():
@@ -980,87 +843,125 @@ def get_question():
     if not player_name:
         return jsonify({'error': 'Player name required'}), 400
     
-    # Get level types for this user
-    level_types = get_level_types_for_user(player_name)
-    levels = {}
-    
     if game_type == 'math':
         current_score = get_player_score(player_name, 'math')
         math_question = get_next_math_question(player_name)
-        if 'chemistry' in level_types:
-            levels['chemistry'] = get_element_level(current_score)
-        if 'cat' in level_types:
-            levels['cat'] = get_cat_level(current_score)
-        return jsonify({
+        return level_response({
             'question': math_question['question'],
             'options': math_question['options'],
             'correct_index': math_question['correct_index'],
             'correct_answer': math_question['correct_answer'],
             'score': current_score,
-            'game_type': 'math',
-            'levels': levels,
-            'level_types': level_types
-        })
+            'game_type': 'math'
+        }, player_name, current_score)
     else:
         current_score = get_player_score(player_name, 'words')
         word_info = get_next_word(player_name, words)
-        if 'chemistry' in level_types:
-            levels['chemistry'] = get_element_level(current_score)
-        if 'cat' in level_types:
-            levels['cat'] = get_cat_level(current_score)
-        return jsonify({
+        return level_response({
             'word': word_info['word'],
             'definition': word_info['definition'],
             'score': current_score,
-            'game_type': 'words',
-            'levels': levels,
-            'level_types': level_types
-        })
+            'game_type': 'words'
+        }, player_name, current_score)
 
-@app.route('/api/answer', methods=['POST'])
-def check_answer_api():
-    data = request.json
-    player_name = data.get('player', '').strip().lower()
-    word = data.get('word')
-    answer = data.get('answer', '').strip()
-    correct_def = data.get('definition')
+@app.route('/api/questions', methods=['GET'])
+def get_questions():
+    """The next n questions in one round trip, for clients that keep a local queue.
+
+    Each answer changes what comes next, so clients should refill their queue
+    after every answer rather than play a whole batch.
+    """
+    player_name = request.args.get('player', '').strip().lower()
+    game_type = request.args.get('game_type', 'words').strip().lower()
     
-    if not player_name or not word or not answer or not correct_def:
-        return jsonify({'error': 'Missing required fields'}), 400
+    if not player_name:
+        return jsonify({'error': 'Player name required'}), 400
+    
+    try:
+        count = int(request.args.get('n', 5))
+    except ValueError:
+        return jsonify({'error': 'n must be an integer'}), 400
+    if not 1 <= count <= QUESTION_BATCH_MAX:
+        return jsonify({'error': f'n must be between 1 and {QUESTION_BATCH_MAX}'}), 400
     
+    if game_type == 'math':
+        current_score = get_player_score(player_name, 'math')
+        questions = [get_next_math_question(player_name) for _ in range(count)]
+    else:
+        game_type = 'words'
+        current_score = get_player_score(player_name, 'words')
+        questions = [word_question(word_info) for word_info in get_next_words(player_name, words, count)]
+    
+    return level_response({
+        'questions': questions,
+        'score': current_score,
+        'game_type': game_type
+    }, player_name, current_score)
+
+grading_jobs = None  # Started by init_services()
+
+def grade_answer(player_name, word, answer, correct_def):
+    """Grade a free-text answer and build the /api/answer response body."""
     is_correct, points, message, show_mc, mc_options, correct_index = check_answer(
         player_name, word, answer, correct_def, words
     )
     
     if is_correct:
         current_score = get_player_score(player_name)
-        level_types = get_level_types_for_user(player_name)
-        levels = {}
-        if 'chemistry' in level_types:
-            levels['chemistry'] = get_element_level(current_score)
-        if 'cat' in level_types:
-            levels['cat'] = get_cat_level(current_score)
-        return jsonify({
+        return {
             'correct': True,
             'points': points,
             'score': current_score,
             'message': message,
-            'levels': levels,
-            'level_types': level_types
-        })
+            **get_levels(player_name, current_score)
+        }
     elif show_mc:
-        return jsonify({
+        return {
             'correct': False,
             'show_mc': True,
             'options': mc_options,
             'correct_index': correct_index
-        })
+        }
     else:
-        return jsonify({
+        return {
             'correct': False,
             'show_mc': False,
             'message': message
-        })
+        }
+
+@app.route('/api/answer', methods=['POST'])
+def check_answer_api():
+    data = request.json
+    player_name = data.get('player', '').strip().lower()
+    word = data.get('word')
+    answer = data.get('answer', '').strip()
+    correct_def = data.get('definition')
+    
+    if not player_name or not word or not answer or not correct_def:
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    if not ASYNC_GRADING:
+        return jsonify(grade_answer(player_name, word, answer, correct_def))
+    
+    # Grade off the web worker; the score is updated when the job completes
+    try:
+        job_id = grading_jobs.submit(grade_answer, player_name, word, answer, correct_def)
+    except QueueFull:
+        return jsonify({'error': 'Too many answers being graded, try again'}), 503
+    return jsonify({'status': 'pending', 'job_id': job_id}), 202
+
+@app.route('/api/answer/<job_id>', methods=['GET'])
+def get_answer_result(job_id):
+    """Poll a grading job. ?wait=N long-polls for up to N seconds (max 30)."""
+    wait = min(max(request.args.get('wait', 0, type=float), 0), 30)
+    status, result = grading_jobs.result(job_id, wait)
+    if status == 'unknown':
+        return jsonify({'error': 'Unknown job'}), 404
+    if status == 'error':
+        return jsonify({'status': 'error', 'error': result}), 500
+    if status == 'pending':
+        return jsonify({'status': 'pending', 'job_id': job_id})
+    return jsonify({'status': 'done', **result})
 
 @app.route('/api/mc_answer', methods=['POST'])
 def check_mc_answer_api():
@@ -1082,21 +983,12 @@ def check_mc_answer_api():
         )
         
         current_score = get_player_score(player_name, 'math')
-        level_types = get_level_types_for_user(player_name)
-        levels = {}
-        if 'chemistry' in level_types:
-            levels['chemistry'] = get_element_level(current_score)
-        if 'cat' in level_types:
-            levels['cat'] = get_cat_level(current_score)
-        
-        return jsonify({
+        return level_response({
             'correct': is_correct,
             'points': points,
             'score': current_score,
-            'message': message,
-            'levels': levels,
-            'level_types': level_types
-        })
+            'message': message
+        }, player_name, current_score)
     else:
         if not all([player_name, selected_index is not None, correct_index is not None, correct_def, word]):
             return jsonify({'error': 'Missing required fields'}), 400
@@ -1106,21 +998,33 @@ def check_mc_answer_api():
         )
         
         current_score = get_player_score(player_name, 'words')
-        level_types = get_level_types_for_user(player_name)
-        levels = {}
-        if 'chemistry' in level_types:
-            levels['chemistry'] = get_element_level(current_score)
-        if 'cat' in level_types:
-            levels['cat'] = get_cat_level(current_score)
-        
-        return jsonify({
+        return level_response({
             'correct': is_correct,
             'points': points,
             'score': current_score,
-            'message': message,
-            'levels': levels,
-            'level_types': level_types
-        })
+            'message': message
+        }, player_name, current_score)
+
+@app.route('/api/catalog', methods=['GET'])
+@app.route('/api/catalog/<version>', methods=['GET'])
+def get_catalog(version=None):
+    """Every element, cat breed and habitat item, for resolving the level numbers in responses.
+
+    /api/catalog/<version> (the version comes with every response's levels)
+    is immutable and cached for a year. Plain /api/catalog is revalidated
+    through its ETag; an outdated version redirects to the current one.
+    """
+    if version is not None and version != level_service.catalog_version:
+        return redirect(url_for('get_catalog', version=level_service.catalog_version))
+    response = app.response_class(level_service.catalog_json, mimetype=app.json.mimetype)
+    response.set_etag(level_service.catalog_version)
+    if version is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = CATALOG_MAX_AGE
+        response.cache_control.immutable = True
+    return response.make_conditional(request)
 
 @app.route('/api/cat_images', methods=['GET'])
 def get_cat_images():
@@ -1130,44 +1034,41 @@ def get_cat_images():
     if not breed_name:
         return jsonify({'error': 'Breed name required'}), 400
     
-    # Convert breed name to directory name (lowercase, underscores)
-    breed_dir_name = breed_name.lower().replace(' ', '_').replace("'", '')
-    assets_dir = Path('assets/cat_images')
-    breed_dir = assets_dir / breed_dir_name
-    
-    images = []
-    
-    # Check if local images exist
-    if breed_dir.exists():
-        # Get all image files in the breed directory
-        image_extensions = ['.jpg', '.jpeg', '.png', '.webp']
-        image_files = []
-        for ext in image_extensions:
-            image_files.extend(breed_dir.glob(f'*{ext}'))
-            image_files.extend(breed_dir.glob(f'*{ext.upper()}'))
-        
-        # Sort by filename to get consistent order
-        image_files.sort()
-        
-        # Debug logging
-        print(f"DEBUG: Looking for images in {breed_dir}")
-        print(f"DEBUG: Found {len(image_files)} image files")
-        for img_file in image_files:
-            print(f"DEBUG:   - {img_file.name}")
-        
-        # Return up to 6 images as URLs
-        for img_file in image_files[:6]:
-            # Create URL path relative to assets
-            img_path = f"cat_images/{breed_dir_name}/{img_file.name}"
-            images.append(f"/assets/{img_path}")
-            print(f"DEBUG: Added image URL: /assets/{img_path}")
-    else:
-        print(f"DEBUG: Directory {breed_dir} does not exist")
-    
     # If no local images found, return empty list (frontend will show emoji)
     # Note: Run download_cat_images.py script to populate local images
-    print(f"DEBUG: Returning {len(images)} images for {breed_name}")
-    return jsonify({'images': images[:6]})  # Return up to 6 images
+    return jsonify({'images': cat_image_index.images(breed_name)})
+
+@app.route('/api/cat_images/batch', methods=['GET'])
+def get_cat_images_batch():
+    """Images for several breeds in one call: ?breed=Persian&breed=Siamese returns {'images': {breed: [...]}}."""
+    breed_names = [name.strip() for name in request.args.getlist('breed') if name.strip()]
+    
+    if not breed_names:
+        return jsonify({'error': 'At least one breed required'}), 400
+    if len(breed_names) > CAT_IMAGE_BATCH_MAX:
+        return jsonify({'error': f'At most {CAT_IMAGE_BATCH_MAX} breeds per request'}), 400
+    
+    return jsonify({'images': {name: cat_image_index.images(name) for name in breed_names}})
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Runtime counters for grading and caching."""
+    return jsonify({
+        'lexical_grader': lexical_grader.stats(),
+        'grade_cache': grade_cache.stats(),
+        'grading_jobs': grading_jobs.stats(),
+        'llm_verdicts': verdict_meter.stats(),
+        'ollama': dict(shared_client.stats(), heartbeat=model_heartbeat.stats()),
+        'grading_breaker': grading_breaker.stats(),
+        'batch_grader': batch_grader.stats() if batch_grader else None,
+        'embedding_grader': embedding_grader.stats() if embedding_grader else None,
+        'distractors': distractor_index.stats(),
+        'word_scheduler': word_scheduler.stats(),
+        'math_pools': question_pools.stats(),
+        'levels': level_service.stats(),
+        'cat_images': cat_image_index.stats(),
+        'thumbnails': thumbnailer.stats()
+    })
 
 # Main entry point
 if __name__ == "__main__":
@@ -1175,8 +1076,39 @@ if __name__ == "__main__":
     parser.add_argument('--cli', action='store_true', help='Use command-line interface instead of web UI')
     parser.add_argument('--games', action='store_true', help='Enable bonus games at milestone scores')
     parser.add_argument('--port', type=int, default=5000, help='Port for web server (default: 5000)')
+    parser.add_argument('--score-backend', choices=['sqlite', 'journal', 'json'], default=SCORE_BACKEND,
+                        help=f'Score storage backend (default: {SCORE_BACKEND})')
+    parser.add_argument('--model', default=OLLAMA_MODEL,
+                        help='Ollama model to grade with; skips model discovery (default: auto-detect)')
+    parser.add_argument('--keep-alive', default=OLLAMA_KEEP_ALIVE,
+                        help=f'How long Ollama keeps the grading model loaded after a request (default: {OLLAMA_KEEP_ALIVE})')
+    parser.add_argument('--play-hours', default='%d-%d' % OLLAMA_PLAY_HOURS if OLLAMA_PLAY_HOURS else 'always',
+                        help='Local hours START-END when the model is kept loaded, or "always" (default: %(default)s)')
+    parser.add_argument('--embedding-model', default=EMBEDDING_MODEL,
+                        help='Ollama embedding model for the fast-path grader, e.g. nomic-embed-text (default: off)')
+    parser.add_argument('--sync-grading', action='store_true',
+                        help='Grade answers inside the /api/answer request instead of as background jobs')
+    parser.add_argument('--grading-batch', type=int, default=GRADING_BATCH_MAX,
+                        help=f'Most answers graded in one LLM prompt, 1 to disable batching (default: {GRADING_BATCH_MAX})')
+    parser.add_argument('--math-pool-depth', type=int, default=MATH_POOL_DEPTH,
+                        help=f'Ready-made math questions kept per grade (default: {MATH_POOL_DEPTH})')
+    parser.add_argument('--flush-interval', type=float, default=SCORE_FLUSH_INTERVAL,
+                        help=f'Seconds between batched score writes, 0 to write every answer (default: {SCORE_FLUSH_INTERVAL})')
     args = parser.parse_args()
     
+    if args.model:
+        model_resolver.pinned = args.model
+    shared_client.keep_alive = args.keep_alive
+    model_heartbeat.play_hours = (None if args.play_hours == 'always'
+                                  else tuple(int(hour) for hour in args.play_hours.split('-')))
+    if args.sync_grading:
+        ASYNC_GRADING = False
+    init_services(args.score_backend, args.flush_interval, args.grading_batch, args.embedding_model,
+                  args.math_pool_depth)
+    
+    # Turn SIGTERM into a normal exit so pending scores are flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     if args.cli:
         # CLI mode
         player_name = input("Enter your name, explorer: ").strip().lower()
@@ -1184,6 +1116,11 @@ if __name__ == "__main__":
     else:
         # Web mode
         print(f"Starting Word Quest Game web server...")
+        # Resolve the grading model once up front, off the startup path
+        model_resolver.refresh_async()
+        model_heartbeat.start()
+        # Fill the math pools for every known grade (and the default) before the first player arrives
+        question_pools.warm(set(NAME_TO_GRADE.values()) | {get_grade_for_name('')})
         print(f"Open your browser to: http://localhost:{args.port}")
         
         # Get local network IP address for access from other devices
@@ -0,0 +1,461 @@
+"""
+Math question generation.
+
+generate_math_question builds one question for a grade. generate_math_questions
+builds many at once for pools, worksheets and benchmarks: operands, answers
+and wrong-answer candidates are NumPy arrays, candidates are deduplicated by
+reduced-fraction value with vectorized comparisons, and every string comes
+from a table precomputed per operand range. Both return the same dicts:
+    {'question': str, 'correct_answer': str, 'options': [4 str], 'correct_index': int}
+Without NumPy (or for a handful of questions) generate_math_questions calls
+the scalar generator n times.
+"""
+
+import functools
+import gc
+import itertools
+import random
+from fractions import Fraction
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency; generate_math_questions falls back to the scalar generator
+    np = None
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_value(value_str):
+    """
+    Convert a value string (integer or fraction) to a normalized tuple for comparison.
+    Returns (numerator, denominator) tuple where the fraction is in simplest form.
+    For integers, returns (value, 1). Results are memoized; option strings repeat a lot.
+    """
+    if isinstance(value_str, (int, float)):
+        value_str = str(int(value_str))
+    
+    if '/' in value_str:
+        try:
+            num_str, den_str = value_str.split('/')
+            num = int(num_str)
+            den = int(den_str)
+            if den == 0:
+                return (num, den)  # Invalid, but return as-is
+            # Simplify the fraction; Fraction also keeps the sign in the numerator
+            value = Fraction(num, den)
+            return (value.numerator, value.denominator)
+        except ValueError:
+            return value_str  # Return as-is if can't parse
+    else:
+        try:
+            num = int(value_str)
+            return (num, 1)
+        except ValueError:
+            return value_str  # Return as-is if can't parse
+
+def _wrong_answers(correct, preferred, fallback):
+    """The first three candidates, in order, whose value differs from `correct` and from each other.
+
+    `preferred` are the plausible mistakes for the question; `fallback` must
+    hold at least three distinct values other than `correct`, so the result
+    always has three entries after at most len(preferred) + len(fallback) checks.
+    """
+    wrong = []
+    seen = {normalize_value(correct)}
+    for candidate in itertools.chain(preferred, fallback):
+        normalized = normalize_value(candidate)
+        if normalized not in seen:
+            wrong.append(candidate)
+            seen.add(normalized)
+            if len(wrong) == 3:
+                return wrong
+    raise ValueError(f"not enough distinct wrong answers for {correct}")
+
+def _integer_wrong_answers(correct, preferred, spread, floor=0):
+    """Three wrong integers (as strings) for an integer answer.
+
+    Candidates are the `preferred` plausible mistakes, then three random
+    offsets within +/- `spread`, then correct + 1, + 2, + 3, which are always
+    valid. Anything below `floor` or already taken is skipped, so at most
+    nine candidates are looked at and no retry loop is needed.
+    """
+    candidates = preferred + [correct + random.randint(-spread, spread) for _ in range(3)]
+    candidates += [correct + 1, correct + 2, correct + 3]
+    wrong = []
+    seen = {correct}
+    for value in candidates:
+        if value >= floor and value not in seen:
+            wrong.append(str(value))
+            seen.add(value)
+            if len(wrong) == 3:
+                return wrong
+
+def generate_math_question(grade):
+    """Generate a math question appropriate for the given grade level. Returns (question, correct_answer, options)."""
+    if grade <= 2:
+        # Grade 2: Simple addition/subtraction within 20
+        a = random.randint(1, 10)
+        b = random.randint(1, 10)
+        op = random.choice(['+', '-'])
+        if op == '+':
+            correct = a + b
+            question = f"{a} + {b} = ?"
+        else:
+            # Ensure non-negative result
+            if a < b:
+                a, b = b, a
+            correct = a - b
+            question = f"{a} - {b} = ?"
+        
+        near = correct - random.randint(1, 5) if correct > 1 else correct + random.randint(6, 10)
+        wrong = _integer_wrong_answers(correct, [correct + random.randint(1, 5), near], 3)
+        
+    elif grade <= 5:
+        # Grade 5: Addition/subtraction with larger numbers, simple multiplication
+        op = random.choice(['+', '-', '*'])
+        if op == '+':
+            a = random.randint(10, 100)
+            b = random.randint(10, 100)
+            correct = a + b
+            question = f"{a} + {b} = ?"
+        elif op == '-':
+            a = random.randint(50, 200)
+            b = random.randint(10, a)
+            correct = a - b
+            question = f"{a} - {b} = ?"
+        else:  # multiplication
+            a = random.randint(2, 12)
+            b = random.randint(2, 12)
+            correct = a * b
+            question = f"{a} × {b} = ?"
+        
+        near = correct - random.randint(5, 15) if correct > 10 else correct + random.randint(16, 25)
+        wrong = _integer_wrong_answers(correct, [correct + random.randint(5, 15), near], 10)
+    
+    else:  # Grade 12
+        # Grade 12: Algebra, fractions, more complex operations
+        question_type = random.choice(['algebra', 'fraction', 'exponent', 'sqrt'])
+        
+        if question_type == 'algebra':
+            # Simple linear equation: ax + b = c, solve for x
+            x_val = random.randint(1, 10)
+            a = random.randint(2, 5)
+            b = random.randint(1, 10)
+            c = a * x_val + b
+            correct = x_val
+            question = f"If {a}x + {b} = {c}, what is x?"
+            near = x_val - random.randint(1, 3) if x_val > 2 else x_val + random.randint(4, 6)
+            wrong = _integer_wrong_answers(correct, [x_val + random.randint(1, 3), near], 3, floor=1)
+        
+        elif question_type == 'fraction':
+            # Simple fraction addition/subtraction
+            num1 = random.randint(1, 5)
+            den1 = random.randint(2, 6)
+            num2 = random.randint(1, 5)
+            den2 = random.randint(2, 6)
+            # For simplicity, use common denominator
+            common_den = den1 * den2
+            sum_num = num1 * den2 + num2 * den1
+            total = Fraction(sum_num, common_den)
+            correct = f"{total.numerator}/{total.denominator}"
+            question = f"{num1}/{den1} + {num2}/{den2} = ?"
+            
+            # Typical mistakes first, then the sum shifted by k/common_den; the three positive shifts always differ
+            preferred = [
+                f"{sum_num + random.randint(1, 3)}/{common_den}",  # Modified numerator
+                f"{sum_num}/{common_den + random.randint(1, 3)}",  # Modified denominator
+                f"{num1 + num2}/{den1 + den2}",  # Incorrect addition
+            ]
+            shifts = [-3, -2, -1, 1, 2, 3]
+            random.shuffle(shifts)
+            fallback = [f"{sum_num + k}/{common_den}" for k in shifts if sum_num + k > 0]
+            wrong = _wrong_answers(correct, preferred, fallback)
+        
+        elif question_type == 'exponent':
+            base = random.randint(2, 5)
+            exp = random.randint(2, 4)
+            correct = base ** exp
+            question = f"{base}²" if exp == 2 else f"{base}³" if exp == 3 else f"{base}^{exp}"
+            wrong = _integer_wrong_answers(correct, [base * exp, base + exp, (base + 1) ** exp], 3)
+        
+        else:  # sqrt
+            num = random.choice([4, 9, 16, 25, 36, 49, 64, 81, 100])
+            correct = int(num ** 0.5)
+            question = f"√{num} = ?"
+            wrong = _integer_wrong_answers(correct, [correct + 1, correct - 1, correct + 2], 3)
+    
+    options = [str(correct)] + wrong
+    random.shuffle(options)
+    correct_index = options.index(str(correct))
+    
+    return {
+        'question': question,
+        'correct_answer': str(correct),
+        'options': options,
+        'correct_index': correct_index
+    }
+
+
+VECTOR_MIN = 48  # Below this many questions the scalar generator is faster than NumPy's fixed overhead
+CANDIDATES = 10  # Wrong-answer candidate columns per question; the last few are guaranteed-distinct fallbacks
+_INT_LIMIT = 4096  # Integer options are below this (the largest is 7**4 plus fallbacks)
+_NUM_LIMIT = 256  # Fraction option numerators are below this
+_DEN_LIMIT = 48  # Fraction option denominators are below this
+_DEN_BITS = 6  # Reduced denominators fit in this many bits, so num << bits | den identifies a value
+
+
+@functools.lru_cache(maxsize=None)
+def _option_strings():
+    """Object array of option strings by code: an integer is its own code, num/den is
+    _INT_LIMIT + (num << _DEN_BITS | den)."""
+    strings = np.empty(_INT_LIMIT + (_NUM_LIMIT << _DEN_BITS), dtype=object)
+    strings[:_INT_LIMIT] = [str(value) for value in range(_INT_LIMIT)]
+    for num, den in np.ndindex(_NUM_LIMIT, _DEN_LIMIT):
+        strings[_INT_LIMIT + (num << _DEN_BITS | den)] = f"{num}/{den}"
+    return strings
+
+
+@functools.lru_cache(maxsize=None)
+def _orders():
+    """All 24 orders of four options, and where the correct option (index 0) lands in each."""
+    orders = np.array(sorted(itertools.permutations(range(4))), dtype=np.intp)
+    return orders, np.argmax(orders == 0, axis=1)
+
+
+@functools.lru_cache(maxsize=None)
+def _question_strings(kind):
+    """Object array of question text for every operand combination of `kind`, indexed by the operands."""
+    formats = {
+        'add': ((101, 101), lambda a, b: f"{a} + {b} = ?"),
+        'sub': ((201, 201), lambda a, b: f"{a} - {b} = ?"),
+        'mul': ((13, 13), lambda a, b: f"{a} × {b} = ?"),
+        'algebra': ((6, 11, 11), lambda a, x, b: f"If {a}x + {b} = {a * x + b}, what is x?"),
+        'fraction': ((6, 7, 6, 7), lambda num1, den1, num2, den2: f"{num1}/{den1} + {num2}/{den2} = ?"),
+        'exponent': ((6, 5), lambda base, exp: f"{base}²" if exp == 2 else f"{base}³" if exp == 3 else f"{base}^{exp}"),
+        'sqrt': ((11,), lambda root: f"√{root * root} = ?"),
+    }
+    shape, text = formats[kind]
+    table = np.empty(shape, dtype=object)
+    for index in np.ndindex(shape):
+        table[index] = text(*index)
+    return table
+
+
+def _uniform(rng, low, high, size):
+    """Integers in [low, high], like random.randint."""
+    return rng.integers(low, high + 1, size, dtype=np.int32)
+
+
+class _Batch:
+    """Arrays for n questions under construction; each question kind fills a contiguous block of rows."""
+
+    def __init__(self, n):
+        self.question = np.empty(n, dtype=object)
+        self.correct_num = np.zeros(n, dtype=np.int32)
+        self.correct_den = np.ones(n, dtype=np.int32)
+        self.num = np.zeros((n, CANDIDATES), dtype=np.int32)
+        self.den = np.ones((n, CANDIDATES), dtype=np.int32)
+        self.fraction = np.zeros(n, dtype=bool)
+        self.floor = np.zeros(n, dtype=np.int32)  # Smallest acceptable wrong answer
+
+    def fill(self, rows, question, correct, columns, correct_den=None, column_dens=None, floor=0):
+        """Set `rows` to `question` with answer correct[/correct_den] and the given candidate columns.
+
+        The remaining columns become correct + 1, correct + 2, ..., so every
+        row has at least three distinct valid wrong answers.
+        """
+        count = len(columns)
+        assert count <= CANDIDATES - 3
+        den = np.ones(len(correct), dtype=np.int32) if correct_den is None else correct_den
+        self.question[rows] = question
+        self.correct_num[rows] = correct
+        self.correct_den[rows] = den
+        self.num[rows, :count] = np.stack(columns, axis=1)
+        self.num[rows, count:] = correct[:, None] + den[:, None] * np.arange(1, CANDIDATES - count + 1)
+        if column_dens is not None:
+            self.fraction[rows] = True
+            self.den[rows, :count] = np.stack(column_dens, axis=1)
+            self.den[rows, count:] = den[:, None]
+        self.floor[rows] = floor
+
+    def _keys(self):
+        """(candidate keys, answer keys): one integer per value, reduced num << _DEN_BITS | reduced den.
+
+        Batches without fractions compare the integers themselves. Every key
+        fits in 16 bits, which halves the memory pick_wrong() has to scan.
+        """
+        if not self.fraction.any():
+            return self.num.astype(np.int16), self.correct_num.astype(np.int16)
+        keys = (self.num << _DEN_BITS) | 1
+        num, den = self.num[self.fraction], self.den[self.fraction]
+        divisor = np.gcd(num, den)
+        keys[self.fraction] = ((num // divisor) << _DEN_BITS) | (den // divisor)
+        return keys.astype(np.int16), ((self.correct_num << _DEN_BITS) | self.correct_den).astype(np.int16)
+
+    def _codes(self, num, den):
+        """_option_strings() codes for (num, den) values; den is only read on fraction rows."""
+        if not self.fraction.any():
+            return num
+        fraction = self.fraction if num.ndim == 1 else self.fraction[:, None]
+        return np.where(fraction, _INT_LIMIT + (num << _DEN_BITS | den), num)
+
+    def pick_wrong(self):
+        """Option codes of the first three valid, value-distinct candidates per row."""
+        keys, correct = self._keys()
+        valid = (self.num >= self.floor[:, None]) & (keys != correct[:, None])
+        rows = np.arange(len(keys))
+        picks = np.empty((len(keys), 3), dtype=np.intp)
+        for slot in range(3):
+            # The fallback columns guarantee a valid candidate is left for every slot
+            picks[:, slot] = column = np.argmax(valid, axis=1)
+            valid &= keys != keys[rows, column][:, None]
+        return self._codes(np.take_along_axis(self.num, picks, axis=1), np.take_along_axis(self.den, picks, axis=1))
+
+    def questions(self, rng):
+        """The finished question dicts, in random order (rows are grouped by kind until now)."""
+        strings = _option_strings()
+        correct = self._codes(self.correct_num, self.correct_den)
+        codes = np.column_stack([correct, self.pick_wrong()])
+        rows = rng.permutation(len(self.question))
+        orders, correct_positions = _orders()
+        shuffle = rng.integers(0, len(orders), len(rows))
+        options = strings[np.take_along_axis(codes[rows], orders[shuffle], axis=1)]
+        answers = strings[correct[rows]]
+        correct_index = correct_positions[shuffle]
+        # Building n dicts triggers the cyclic collector over and over; none of them can form cycles
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return [{'question': question, 'correct_answer': answer, 'options': row, 'correct_index': index}
+                    for question, answer, row, index in zip(self.question[rows].tolist(), answers.tolist(),
+                                                            options.tolist(), correct_index.tolist())]
+        finally:
+            if collecting:
+                gc.enable()
+
+
+def _integer_wrongs(rng, correct, step, threshold, jump, spread, wide):
+    """Wrong-answer candidates around an integer answer, as the scalar generator draws them.
+
+    correct + step, correct - step (or a jump upwards when correct is at most
+    `threshold`), then random offsets within `spread` and within `wide`.
+    """
+    size = len(correct)
+    columns = [correct + _uniform(rng, *step, size),
+               np.where(correct > threshold, correct - _uniform(rng, *step, size), correct + _uniform(rng, *jump, size))]
+    columns += [correct + _uniform(rng, -spread, spread, size) for _ in range(3)]
+    columns += [correct + _uniform(rng, -wide, wide, size) for _ in range(2)]
+    return columns
+
+
+_SMALL_WRONGS = ((1, 5), 1, (6, 10), 3, 10)  # Grade 2 offsets for _integer_wrongs
+_MEDIUM_WRONGS = ((5, 15), 10, (16, 25), 10, 20)  # Grade 5 offsets
+
+
+def _sum(rng, batch, rows, low, high, wrongs):
+    """a + b with both operands in [low, high]."""
+    size = rows.stop - rows.start
+    a, b = _uniform(rng, low, high, size), _uniform(rng, low, high, size)
+    correct = a + b
+    batch.fill(rows, _question_strings('add')[a, b], correct, _integer_wrongs(rng, correct, *wrongs))
+
+
+def _small_difference(rng, batch, rows, wrongs):
+    """a - b with operands in 1..10, larger first so the answer is never negative."""
+    size = rows.stop - rows.start
+    a, b = _uniform(rng, 1, 10, size), _uniform(rng, 1, 10, size)
+    high, low = np.maximum(a, b), np.minimum(a, b)
+    correct = high - low
+    batch.fill(rows, _question_strings('sub')[high, low], correct, _integer_wrongs(rng, correct, *wrongs))
+
+
+def _difference(rng, batch, rows, wrongs):
+    """a - b with a in 50..200 and b in 10..a."""
+    size = rows.stop - rows.start
+    a = _uniform(rng, 50, 200, size)
+    b = 10 + (rng.random(size) * (a - 9)).astype(np.int32)
+    correct = a - b
+    batch.fill(rows, _question_strings('sub')[a, b], correct, _integer_wrongs(rng, correct, *wrongs))
+
+
+def _product(rng, batch, rows, wrongs):
+    """Times tables up to 12."""
+    size = rows.stop - rows.start
+    a, b = _uniform(rng, 2, 12, size), _uniform(rng, 2, 12, size)
+    correct = a * b
+    batch.fill(rows, _question_strings('mul')[a, b], correct, _integer_wrongs(rng, correct, *wrongs))
+
+
+def _algebra(rng, batch, rows):
+    """Grade 12: solve ax + b = c for x."""
+    size = rows.stop - rows.start
+    x, a, b = _uniform(rng, 1, 10, size), _uniform(rng, 2, 5, size), _uniform(rng, 1, 10, size)
+    columns = [x + _uniform(rng, 1, 3, size),
+               np.where(x > 2, x - _uniform(rng, 1, 3, size), x + _uniform(rng, 4, 6, size))]
+    columns += [x + _uniform(rng, -2, 2, size) for _ in range(3)]
+    columns += [x + _uniform(rng, -10, 10, size) for _ in range(2)]
+    batch.fill(rows, _question_strings('algebra')[a, x, b], x, columns, floor=1)
+
+
+def _fraction(rng, batch, rows):
+    """Grade 12: add two fractions; wrong answers compare by reduced value."""
+    size = rows.stop - rows.start
+    num1, den1 = _uniform(rng, 1, 5, size), _uniform(rng, 2, 6, size)
+    num2, den2 = _uniform(rng, 1, 5, size), _uniform(rng, 2, 6, size)
+    common = den1 * den2
+    total = num1 * den2 + num2 * den1
+    divisor = np.gcd(total, common)
+    nums = [total + _uniform(rng, 1, 3, size), total, num1 + num2, _uniform(rng, 1, 20, size)]
+    dens = [common, common + _uniform(rng, 1, 3, size), den1 + den2, _uniform(rng, 2, 20, size)]
+    nums += [_uniform(rng, 1, 30, size) for _ in range(3)]
+    dens += [_uniform(rng, 2, 30, size) for _ in range(3)]
+    batch.fill(rows, _question_strings('fraction')[num1, den1, num2, den2], total // divisor, nums,
+               correct_den=common // divisor, column_dens=dens)
+
+
+def _exponent(rng, batch, rows):
+    """Grade 12: small powers."""
+    size = rows.stop - rows.start
+    base, exp = _uniform(rng, 2, 5, size), _uniform(rng, 2, 4, size)
+    columns = [base * exp, base + exp, (base + 1) ** exp]
+    columns += [base * exp + _uniform(rng, -2, 2, size), base + exp + _uniform(rng, -2, 2, size)]
+    columns += [(base + _uniform(rng, -1, 2, size)) ** exp for _ in range(2)]
+    batch.fill(rows, _question_strings('exponent')[base, exp], base ** exp, columns)
+
+
+def _square_root(rng, batch, rows):
+    """Grade 12: square roots of perfect squares 4..100."""
+    size = rows.stop - rows.start
+    root = _uniform(rng, 2, 10, size)
+    columns = [root + 1, root - 1, root + 2] + [root + _uniform(rng, 2, 3, size) for _ in range(2)]
+    batch.fill(rows, _question_strings('sqrt')[root], root, columns)
+
+
+# Question kinds per grade band, picked with equal probability like the scalar generator's random.choice
+_BUILDERS = {
+    2: (functools.partial(_sum, low=1, high=10, wrongs=_SMALL_WRONGS),
+        functools.partial(_small_difference, wrongs=_SMALL_WRONGS)),
+    5: (functools.partial(_sum, low=10, high=100, wrongs=_MEDIUM_WRONGS),
+        functools.partial(_difference, wrongs=_MEDIUM_WRONGS),
+        functools.partial(_product, wrongs=_MEDIUM_WRONGS)),
+    12: (_algebra, _fraction, _exponent, _square_root),
+}
+
+
+def generate_math_questions(grade, n, rng=None):
+    """Generate `n` questions for `grade` at once, each shaped like generate_math_question's.
+
+    `rng` is a numpy.random.Generator (a fresh one by default). Every
+    question has four options with distinct values. Small batches, or any
+    batch without NumPy, come from the scalar generator.
+    """
+    if np is None or n < VECTOR_MIN:
+        return [generate_math_question(grade) for _ in range(n)]
+    rng = np.random.default_rng() if rng is None else rng
+    builders = _BUILDERS[2 if grade <= 2 else 5 if grade <= 5 else 12]
+    batch = _Batch(n)
+    start = 0
+    for build, count in zip(builders, rng.multinomial(n, [1 / len(builders)] * len(builders)).tolist()):
+        if count:
+            build(rng, batch, slice(start, start + count))
+        start += count
+    return batch.questions(rng)
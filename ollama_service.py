@@ -0,0 +1,490 @@
+"""
+Shared access to the local Ollama server used for answer grading.
+
+ModelResolver decides which model to use once and caches the answer, so the
+grading path does not pay for an extra ollama.list() round trip per answer.
+ask_verdict() constrains a grading call to a one-word JSON verdict and stops
+reading the stream as soon as that word appears. Every call goes through one
+long-lived SharedClient, so HTTP connections are pooled and each request
+carries an explicit keep_alive; ModelHeartbeat keeps the model loaded during
+play hours so children don't wait through a cold load.
+"""
+
+import collections
+import re
+import threading
+import time
+
+# Preferred models, in order; the first installed match wins
+MODEL_PREFERENCE = ['mistral', 'llama2', 'llama3', 'phi', 'gemma']
+
+
+class SharedClient:
+    """One lazily created ollama.Client reused for every request.
+
+    The underlying httpx client keeps connections alive between calls.
+    chat(), embed() and load() add `keep_alive` unless the caller passes one,
+    and a response whose load_duration exceeds `cold_load_seconds` is logged
+    and counted as a cold load. Streamed chats that are abandoned early never
+    report load_duration, so cold loads are seen through the other calls and
+    the heartbeat.
+
+    Requests made on behalf of a waiting player give up after `timeout`
+    seconds without a response; chat(timeout=...) sets a shorter limit for one
+    call. load() and embed(bounded=False) use a second client without a
+    timeout, since loading a model can legitimately take much longer than
+    grading one answer.
+    """
+
+    def __init__(self, host=None, keep_alive='30m', cold_load_seconds=1.0, timeout=10.0):
+        self.host = host  # None uses OLLAMA_HOST or the default local server
+        self.keep_alive = keep_alive
+        self.cold_load_seconds = cold_load_seconds
+        self.timeout = timeout
+        self._client = None
+        self._unbounded_client = None
+        self._lock = threading.Lock()
+        self._local = threading.local()  # .timeout: the limit for the request this thread sends next
+        self.counts = collections.Counter()
+        self.last_cold_load = None  # (model, seconds, unix time)
+
+    @property
+    def client(self):
+        if self._client is None:
+            import ollama
+
+            with self._lock:
+                if self._client is None:
+                    self._client = ollama.Client(host=self.host, timeout=self.timeout,
+                                                 event_hooks={'request': [self._apply_timeout]})
+        return self._client
+
+    def _apply_timeout(self, request):
+        """httpx request hook: a per-call timeout replaces the client's for this request."""
+        timeout = getattr(self._local, 'timeout', None)
+        if timeout is not None:
+            import httpx
+
+            request.extensions['timeout'] = httpx.Timeout(timeout).as_dict()
+
+    def _timed(self, stream, timeout):
+        """Iterate `stream` with `timeout` applied; a streamed chat only sends its request on the first chunk."""
+        try:
+            while True:
+                self._local.timeout = timeout
+                try:
+                    chunk = next(stream)
+                except StopIteration:
+                    return
+                finally:
+                    self._local.timeout = None
+                yield chunk
+        finally:
+            stream.close()
+
+    @property
+    def unbounded_client(self):
+        if self._unbounded_client is None:
+            import ollama
+
+            with self._lock:
+                if self._unbounded_client is None:
+                    self._unbounded_client = ollama.Client(host=self.host, timeout=None)
+        return self._unbounded_client
+
+    def _observe(self, model, response):
+        load_seconds = (getattr(response, 'load_duration', None) or 0) / 1e9
+        with self._lock:
+            self.counts['requests'] += 1
+            if load_seconds < self.cold_load_seconds:
+                return
+            self.counts['cold_loads'] += 1
+            self.last_cold_load = (model, load_seconds, time.time())
+        print(f"Ollama cold-loaded {model} in {load_seconds:.1f}s")
+
+    def chat(self, timeout=None, **kwargs):
+        """ollama.Client.chat; `timeout` (seconds) replaces the client's timeout for this call."""
+        kwargs.setdefault('keep_alive', self.keep_alive)
+        if kwargs.get('stream'):
+            response = self.client.chat(**kwargs)
+            with self._lock:
+                self.counts['requests'] += 1
+            return self._timed(response, timeout) if timeout is not None else response
+        self._local.timeout = timeout
+        try:
+            response = self.client.chat(**kwargs)
+        finally:
+            self._local.timeout = None
+        self._observe(kwargs.get('model'), response)
+        return response
+
+    def embed(self, bounded=True, **kwargs):
+        kwargs.setdefault('keep_alive', self.keep_alive)
+        response = (self.client if bounded else self.unbounded_client).embed(**kwargs)
+        self._observe(kwargs.get('model'), response)
+        return response
+
+    def load(self, model):
+        """Load `model` (or just extend its keep_alive) without generating anything."""
+        response = self.unbounded_client.generate(model=model, prompt='', keep_alive=self.keep_alive)
+        self._observe(model, response)
+        return response
+
+    def list(self):
+        return self.client.list()
+
+    def stats(self):
+        with self._lock:
+            last = self.last_cold_load
+            return {
+                'keep_alive': self.keep_alive,
+                'requests': self.counts['requests'],
+                'cold_loads': self.counts['cold_loads'],
+                'last_cold_load': {'model': last[0], 'seconds': last[1], 'at': last[2]} if last else None,
+            }
+
+
+shared_client = SharedClient()
+
+
+def list_ollama_models():
+    """Return the names of the models installed on the Ollama server."""
+    models_response = shared_client.list()
+    return [m.model for m in models_response.models] if hasattr(models_response, 'models') else []
+
+
+def pick_model(available_models, preference=MODEL_PREFERENCE):
+    """Pick the best model from `available_models`. Returns model name or None."""
+    for model_name in preference:
+        for available in available_models:
+            if model_name in available.lower():
+                return available
+    return available_models[0] if available_models else None
+
+
+def chat_content(model, prompt, format=None):
+    """Send one user message and return the reply text. `format` may be 'json' or a JSON schema."""
+    kwargs = {'format': format} if format is not None else {}
+    response = shared_client.chat(model=model, messages=[{"role": "user", "content": prompt}],
+                                  options={'temperature': 0}, **kwargs)
+    return response['message']['content']
+
+
+# Grammar for a single grading verdict; the model cannot produce anything else
+VERDICT_SCHEMA = {
+    'type': 'object',
+    'properties': {'verdict': {'type': 'string', 'enum': ['yes', 'no']}},
+    'required': ['verdict'],
+}
+VERDICT_NUM_PREDICT = 8  # {"verdict": "yes"} is well under this on common tokenizers
+
+# The enum makes the first letter after the quote decisive
+_VERDICT_RE = re.compile(r'"verdict"\s*:\s*"([yn])')
+
+
+class VerdictMeter:
+    """Generated tokens and time-to-verdict of constrained grading calls."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._tokens = collections.deque(maxlen=window)
+        self._latencies_ms = collections.deque(maxlen=window)
+        self.counts = collections.Counter()
+
+    def record(self, tokens, seconds, verdict):
+        with self._lock:
+            self.counts['calls'] += 1
+            self.counts['tokens'] += tokens
+            if verdict is None:
+                self.counts['no_verdict'] += 1
+            self._tokens.append(tokens)
+            self._latencies_ms.append(seconds * 1000)
+
+    def stats(self):
+        with self._lock:
+            calls = self.counts['calls']
+            latencies = sorted(self._latencies_ms)
+            return {
+                'calls': calls,
+                'no_verdict': self.counts['no_verdict'],
+                'mean_tokens': self.counts['tokens'] / calls if calls else 0.0,
+                'max_tokens': max(self._tokens, default=0),
+                'time_to_verdict_ms': {
+                    f'p{p}': latencies[min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))]
+                    if latencies else None for p in (50, 90, 99)
+                },
+            }
+
+
+def ask_verdict(model, prompt, num_predict=VERDICT_NUM_PREDICT, meter=None, budget=None):
+    """Ask a yes/no question with output constrained to VERDICT_SCHEMA.
+
+    The reply is streamed and abandoned as soon as the verdict is readable,
+    which also cancels generation on the server. Returns True/False, or None
+    if no verdict arrived within `num_predict` tokens or `budget` seconds
+    (also the request timeout, when shorter than the client's). Ollama errors
+    (including timeouts waiting for a chunk) propagate.
+    """
+    start = time.perf_counter()
+    tokens = 0
+    verdict = None
+    text = ''
+    timeout = None if budget is None else min(budget, shared_client.timeout or budget)
+    stream = shared_client.chat(timeout=timeout, model=model, messages=[{"role": "user", "content": prompt}],
+                                stream=True, format=VERDICT_SCHEMA,
+                                options={'temperature': 0, 'num_predict': num_predict})
+    try:
+        for chunk in stream:
+            tokens += 1
+            text += chunk['message']['content']
+            match = _VERDICT_RE.search(text)
+            if match:
+                verdict = match.group(1) == 'y'
+                break
+            if budget is not None and time.perf_counter() - start > budget:
+                break
+    finally:
+        stream.close()
+    if meter is not None:
+        meter.record(tokens, time.perf_counter() - start, verdict)
+    return verdict
+
+
+def embed_texts(model, texts, bounded=True):
+    """Embed a list of strings with an Ollama embedding model. Returns a list of vectors."""
+    return shared_client.embed(bounded=bounded, model=model, input=texts)['embeddings']
+
+
+def is_model_not_found(error):
+    """True if an Ollama error means the requested model is not installed."""
+    status_code = getattr(error, 'status_code', None)
+    return status_code == 404 or 'not found' in str(error).lower()
+
+
+class ModelResolver:
+    """Caches the grading model name with a TTL.
+
+    The first get() resolves synchronously; after that a stale entry is
+    returned immediately while a background thread refreshes it. A pinned
+    model skips discovery entirely. invalidate() forces the next get() to
+    rediscover, e.g. after the server reports the model is gone.
+    """
+
+    def __init__(self, list_models=list_ollama_models, ttl=300, failure_ttl=30, pinned=None):
+        self._list_models = list_models
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl  # Retry sooner when Ollama was unreachable
+        self.pinned = pinned
+        self._model = None
+        self._expires_at = 0
+        self._resolved = False
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self):
+        """Return the model to use, or None if no model is available."""
+        if self.pinned:
+            return self.pinned
+        if not self._resolved:
+            return self.refresh()
+        if time.monotonic() >= self._expires_at:
+            self.refresh_async()
+        return self._model
+
+    def refresh(self):
+        """Run model discovery now and cache the result."""
+        with self._lock:
+            try:
+                model = pick_model(self._list_models())
+            except Exception:
+                model = None
+            self._model = model
+            self._expires_at = time.monotonic() + (self.ttl if model else self.failure_ttl)
+            self._resolved = True
+            self._refreshing = False
+            return model
+
+    def refresh_async(self):
+        """Refresh in a background thread unless a refresh is already running."""
+        if self.pinned or self._refreshing:
+            return
+        self._refreshing = True
+        threading.Thread(target=self.refresh, name='ollama-model-refresh', daemon=True).start()
+
+    def invalidate(self):
+        """Drop the cached model so the next get() rediscovers it."""
+        if self.pinned:
+            return
+        with self._lock:
+            self._model = None
+            self._resolved = False
+
+
+class ModelHeartbeat:
+    """Keeps the grading model loaded during play hours.
+
+    Every `interval` seconds inside `play_hours` (a (start, end) pair of local
+    hours, or None for always) the model is loaded with an empty request,
+    which costs nothing when it is already resident and resets its keep_alive
+    timer. poke() asks for a load right away (starting the thread if needed),
+    e.g. when a player starts a game outside play hours; pokes within
+    `min_gap` seconds of a load are ignored.
+    """
+
+    def __init__(self, client, get_model, interval=300, play_hours=None, min_gap=30):
+        self._client = client
+        self._get_model = get_model
+        self.interval = interval
+        self.play_hours = play_hours
+        self.min_gap = min_gap
+        self._wake = threading.Event()
+        self._last_beat = None
+        self._started = False
+        self._lock = threading.Lock()
+        self.counts = collections.Counter()
+
+    def in_play_hours(self, now=None):
+        if self.play_hours is None:
+            return True
+        start, end = self.play_hours
+        hour = time.localtime(now).tm_hour
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name='ollama-heartbeat', daemon=True).start()
+
+    def poke(self):
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        poked = False
+        while True:
+            recent = self._last_beat is not None and time.monotonic() - self._last_beat < self.min_gap
+            if (poked and not recent) or (not poked and self.in_play_hours()):
+                self.beat()
+            poked = self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def beat(self):
+        """Load the current model now. Returns True on success."""
+        model = self._get_model()
+        if not model:
+            return False
+        try:
+            self._client.load(model)
+        except Exception:
+            with self._lock:
+                self.counts['failures'] += 1
+            return False
+        with self._lock:
+            self.counts['beats'] += 1
+            self._last_beat = time.monotonic()
+        return True
+
+    def stats(self):
+        with self._lock:
+            last = self._last_beat
+            return {
+                'running': self._started,
+                'interval': self.interval,
+                'play_hours': list(self.play_hours) if self.play_hours else None,
+                'in_play_hours': self.in_play_hours(),
+                'beats': self.counts['beats'],
+                'failures': self.counts['failures'],
+                'seconds_since_beat': time.monotonic() - last if last is not None else None,
+            }
+
+
+class CircuitBreaker:
+    """Stops calling the model after repeated slow or failed calls.
+
+    closed: calls go through. `failure_threshold` consecutive failures (errors,
+    or calls slower than `slow_call_seconds`) open the breaker.
+    open: allow() returns False for `reset_timeout` seconds.
+    half_open: one probe call at a time is let through; `probes_to_close`
+    successful probes in a row close the breaker, a failed one reopens it.
+
+    Every allow() that returns True must be followed by one record().
+    """
+
+    def __init__(self, failure_threshold=3, slow_call_seconds=8.0, reset_timeout=30, probes_to_close=2):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.probes_to_close = probes_to_close
+        self.state = 'closed'
+        self._failures = 0
+        self._probe_successes = 0
+        self._probe_in_flight = False
+        self._opened_at = 0
+        self._lock = threading.Lock()
+        self.counts = collections.Counter()
+
+    def allow(self):
+        """True if a call may go to the model now."""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.counts['short_circuited'] += 1
+                    return False
+                self.state = 'half_open'
+                self._probe_successes = 0
+                self._probe_in_flight = False
+            if self.state == 'half_open':
+                if self._probe_in_flight:
+                    self.counts['short_circuited'] += 1
+                    return False
+                self._probe_in_flight = True
+                self.counts['probes'] += 1
+            return True
+
+    def record(self, ok, seconds):
+        """Report the outcome of an allowed call."""
+        failed = not ok or seconds > self.slow_call_seconds
+        with self._lock:
+            if failed:
+                self.counts['slow' if ok else 'failed'] += 1
+            if self.state == 'half_open':
+                self._probe_in_flight = False
+                if failed:
+                    self._trip()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes_to_close:
+                    self.state = 'closed'
+                    self._failures = 0
+                    print("Grading circuit breaker closed; the model is answering again")
+                return
+            if not failed:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self.state == 'closed' and self._failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        self.state = 'open'
+        self._opened_at = time.monotonic()
+        self.counts['trips'] += 1
+        print(f"Grading circuit breaker opened; skipping the model for {self.reset_timeout}s")
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self.state == 'open':
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                'state': self.state,
+                'trips': self.counts['trips'],
+                'consecutive_failures': self._failures,
+                'failed_calls': self.counts['failed'],
+                'slow_calls': self.counts['slow'],
+                'short_circuited': self.counts['short_circuited'],
+                'probes': self.counts['probes'],
+                'seconds_until_probe': retry_in,
+            }
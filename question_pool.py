@@ -0,0 +1,111 @@
+"""
+Pre-generated math question pools.
+
+Generating a math question runs several retry loops, and /api/question used
+to do that inside the request. QuestionPools keeps a queue of ready-made
+questions per grade instead. A background thread tops each queue up to
+`depth`, so a request only pops one. If a pool runs dry, the question is
+generated inline as before and the fallback is counted.
+"""
+
+import collections
+import threading
+import time
+
+
+class QuestionPools:
+    """Per-grade queues of questions from `generate(grade, n)`, refilled in the background.
+
+    A grade gets a pool the first time it is asked for (or through warm()).
+    The refill thread starts on first use and wakes whenever a pool drops
+    below half of `depth`; it refills in chunks of `batch` so one grade can't
+    hold up the others for long.
+    """
+
+    def __init__(self, generate, depth=200, batch=50):
+        self._generate = generate
+        self.depth = depth
+        self.batch = batch
+        self._pools = {}  # grade -> deque of questions
+        self._wake = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.refill_seconds = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name='question-pools', daemon=True).start()
+
+    def warm(self, grades):
+        """Create pools for `grades` and start filling them."""
+        for grade in grades:
+            self._pools.setdefault(grade, collections.deque())
+        self.start()
+        self._wake.set()
+
+    def get(self, grade):
+        """Pop a ready question for `grade`, or generate one inline if its pool is empty."""
+        pool = self._pools.get(grade)
+        if pool is None:
+            pool = self._pools.setdefault(grade, collections.deque())
+        try:
+            question = pool.popleft()
+        except IndexError:
+            question = None
+        if len(pool) < self.depth // 2:
+            self.start()
+            self._wake.set()
+        with self._lock:
+            self.counts['served'] += 1
+            if question is None:
+                self.counts['fallbacks'] += 1
+        if question is None:
+            question = self._generate(grade, 1)[0]
+        return question
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while self._refill_once():
+                pass
+
+    def _refill_once(self):
+        """Add up to `batch` questions to every pool below depth. Returns True if any were added."""
+        added = False
+        for grade, pool in list(self._pools.items()):
+            missing = min(self.batch, self.depth - len(pool))
+            if missing <= 0:
+                continue
+            start = time.perf_counter()
+            try:
+                questions = self._generate(grade, missing)
+            except Exception:
+                with self._lock:
+                    self.counts['refill_errors'] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            pool.extend(questions)
+            added = True
+            with self._lock:
+                self.counts['refilled'] += len(questions)
+                self.refill_seconds += elapsed
+        return added
+
+    def stats(self):
+        with self._lock:
+            refilled = self.counts['refilled']
+            return {
+                'running': self._started,
+                'depth': self.depth,
+                'pools': {str(grade): len(pool) for grade, pool in sorted(self._pools.items())},
+                'served': self.counts['served'],
+                'fallbacks': self.counts['fallbacks'],
+                'refilled': refilled,
+                'refill_errors': self.counts['refill_errors'],
+                'refill_per_second': refilled / self.refill_seconds if self.refill_seconds else None,
+            }
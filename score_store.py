@@ -0,0 +1,837 @@
+"""
+Score storage backends for the Word Quest game.
+
+Every store exposes the same small interface used by main.py:
+
+    get_score(player, game_type)          -> total for 'words' or 'math'
+    ensure_player(player, game_type)      -> total, creating a 0 entry if missing
+    add_score(player, points, game_type)  -> new total
+    get_word_scores(player)               -> {word: points}
+    add_word_points(player, word, points) -> new 'words' total (word row + total)
+    record_answer(player, kind, points, word)
+                                          -> apply a graded 'text', 'mc' or 'math' answer
+    weakest_words(player, words, limit)   -> the `limit` weakest entries of `words`
+    get_reviews(player)                   -> {word: (box, due)} spaced-repetition state
+    set_review(player, word, box, due)    -> store one word's review state
+    get_schedule(player) / set_schedule(player, mode)
+                                          -> word scheduling mode, 'weakest' or 'leitner'
+
+JsonScoreStore is the original scores.json layout (top-level word totals plus
+'word_scores' and 'math_scores' dicts) and rewrites the whole file on every
+change. SqliteScoreStore keeps one row per (player, word) and per player total
+in a WAL-mode database, so each answer is a single-row upsert.
+
+CachedScoreStore wraps either backend: reads are served from memory and dirty
+players are written back in batches by a background flusher.
+
+JournalScoreStore also serves from memory, but persists by appending one line
+per change to a journal that is periodically compacted into a snapshot.
+"""
+
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+GAME_TYPES = ('words', 'math')
+LOCK_STRIPES = 64
+SCHEDULES = ('weakest', 'leitner')
+DEFAULT_SCHEDULE = 'weakest'
+# Top-level keys of the scores.json layout that are not player totals
+RESERVED_KEYS = ('word_scores', 'math_scores', 'reviews', 'schedules')
+
+
+def _is_history_only(record):
+    """A wrong free-text answer is journaled but changes no score."""
+    return record['k'] == 'text' and not record['d']
+
+
+def _apply_answer(store, player, kind, points, word=None):
+    """record_answer for stores that keep no answer history."""
+    if kind == 'math':
+        # Creates the math entry even for a wrong answer
+        return store.add_score(player, points, 'math')
+    if kind == 'mc' or points:
+        # A wrong multiple-choice answer still marks the word as seen
+        return store.add_word_points(player, word, points)
+    return store.get_score(player)
+
+
+def _sort_weakest(words, user_word_scores, limit):
+    """Legacy ordering: unseen words first (in deck order), then lowest score."""
+    sorted_words = sorted(words, key=lambda w: user_word_scores.get(w['word'], -float('inf')))
+    return sorted_words[:limit]
+
+
+class JsonScoreStore:
+    """Whole-file JSON store. Every read parses and every write rewrites scores.json."""
+
+    def __init__(self, path):
+        self.path = path
+        # The file is the unit of update, so read-modify-write needs one global lock
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _save(self, data):
+        # Write to a temp file and rename so a crash never leaves a truncated scores.json
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.scores-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+                f.write('\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get_score(self, player, game_type='words'):
+        data = self._load()
+        if game_type == 'math':
+            return data.get('math_scores', {}).get(player, 0)
+        return data.get(player, 0)
+
+    def ensure_player(self, player, game_type='words'):
+        with self._lock:
+            data = self._load()
+            if game_type == 'math':
+                totals = data.setdefault('math_scores', {})
+            else:
+                totals = data
+            if player not in totals:
+                totals[player] = 0
+                self._save(data)
+            return totals[player]
+
+    def add_score(self, player, points, game_type='words'):
+        with self._lock:
+            data = self._load()
+            totals = data.setdefault('math_scores', {}) if game_type == 'math' else data
+            totals[player] = totals.get(player, 0) + points
+            self._save(data)
+            return totals[player]
+
+    def get_word_scores(self, player):
+        return dict(self._load().get('word_scores', {}).get(player, {}))
+
+    def add_word_points(self, player, word, points):
+        with self._lock:
+            data = self._load()
+            user_scores = data.setdefault('word_scores', {}).setdefault(player, {})
+            user_scores[word] = user_scores.get(word, 0) + points
+            data[player] = data.get(player, 0) + points
+            self._save(data)
+            return data[player]
+
+    def record_answer(self, player, kind, points, word=None):
+        return _apply_answer(self, player, kind, points, word)
+
+    def weakest_words(self, player, words, limit=10):
+        return _sort_weakest(words, self.get_word_scores(player), limit)
+
+    def get_reviews(self, player):
+        return {word: tuple(state) for word, state in self._load().get('reviews', {}).get(player, {}).items()}
+
+    def set_review(self, player, word, box, due):
+        with self._lock:
+            data = self._load()
+            data.setdefault('reviews', {}).setdefault(player, {})[word] = [box, due]
+            self._save(data)
+
+    def get_schedule(self, player):
+        return self._load().get('schedules', {}).get(player, DEFAULT_SCHEDULE)
+
+    def set_schedule(self, player, mode):
+        with self._lock:
+            data = self._load()
+            data.setdefault('schedules', {})[player] = mode
+            self._save(data)
+
+    def write_batch(self, totals, word_rows, review_rows=(), schedule_rows=()):
+        """Set absolute values: totals are (player, game_type, score), word_rows (player, word, score),
+        review_rows (player, word, box, due) and schedule_rows (player, mode)."""
+        with self._lock:
+            data = self._load()
+            for player, game_type, score in totals:
+                target = data.setdefault('math_scores', {}) if game_type == 'math' else data
+                target[player] = score
+            for player, word, score in word_rows:
+                data.setdefault('word_scores', {}).setdefault(player, {})[word] = score
+            for player, word, box, due in review_rows:
+                data.setdefault('reviews', {}).setdefault(player, {})[word] = [box, due]
+            for player, mode in schedule_rows:
+                data.setdefault('schedules', {})[player] = mode
+            self._save(data)
+
+    def export(self):
+        """Return the full score data in the scores.json layout."""
+        data = self._load()
+        for key in RESERVED_KEYS:
+            data.setdefault(key, {})
+        return data
+
+    def close(self):
+        pass
+
+
+class SqliteScoreStore:
+    """SQLite (WAL) store with one row per (player, word) and per (player, game_type) total."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS player_scores (
+            player TEXT NOT NULL,
+            game_type TEXT NOT NULL,
+            score INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (player, game_type)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS word_scores (
+            player TEXT NOT NULL,
+            word TEXT NOT NULL,
+            score INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (player, word)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_word_scores_weakest ON word_scores (player, score);
+        CREATE TABLE IF NOT EXISTS reviews (
+            player TEXT NOT NULL,
+            word TEXT NOT NULL,
+            box INTEGER NOT NULL,
+            due REAL NOT NULL,
+            PRIMARY KEY (player, word)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS schedules (
+            player TEXT PRIMARY KEY,
+            mode TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # One connection for every thread: Werkzeug runs each request on a new thread, so
+        # per-thread connections would pile up. WAL keeps the statements short.
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+        self._lock = threading.RLock()
+        self._deck = None  # The words list currently loaded into temp.deck
+        self._deck_words = {}
+
+    @contextmanager
+    def _connection(self):
+        """The shared connection, held for the duration of the block (transactions included)."""
+        with self._lock:
+            yield self._db
+
+    def get_score(self, player, game_type='words'):
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT score FROM player_scores WHERE player = ? AND game_type = ?",
+                (player, game_type)).fetchone()
+        return row[0] if row else 0
+
+    def ensure_player(self, player, game_type='words'):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO player_scores (player, game_type, score) VALUES (?, ?, 0)",
+                (player, game_type))
+            return self.get_score(player, game_type)
+
+    def add_score(self, player, points, game_type='words'):
+        with self._connection() as conn:
+            row = conn.execute(
+                "INSERT INTO player_scores (player, game_type, score) VALUES (?, ?, ?) "
+                "ON CONFLICT (player, game_type) DO UPDATE SET score = score + excluded.score "
+                "RETURNING score",
+                (player, game_type, points)).fetchone()
+        return row[0]
+
+    def get_word_scores(self, player):
+        with self._connection() as conn:
+            return dict(conn.execute("SELECT word, score FROM word_scores WHERE player = ?", (player,)))
+
+    def add_word_points(self, player, word, points):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO word_scores (player, word, score) VALUES (?, ?, ?) "
+                    "ON CONFLICT (player, word) DO UPDATE SET score = score + excluded.score",
+                    (player, word, points))
+                total = conn.execute(
+                    "INSERT INTO player_scores (player, game_type, score) VALUES (?, 'words', ?) "
+                    "ON CONFLICT (player, game_type) DO UPDATE SET score = score + excluded.score "
+                    "RETURNING score",
+                    (player, points)).fetchone()[0]
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return total
+
+    def record_answer(self, player, kind, points, word=None):
+        return _apply_answer(self, player, kind, points, word)
+
+    def _use_deck(self, conn, words):
+        """Load the deck's words into temp.deck (once per deck) so queries can join on it."""
+        if self._deck is not words:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS deck (word TEXT PRIMARY KEY) WITHOUT ROWID")
+            conn.execute("DELETE FROM temp.deck")
+            conn.executemany("INSERT OR IGNORE INTO temp.deck (word) VALUES (?)", ((w['word'],) for w in words))
+            self._deck = words
+            self._deck_words = {w['word']: w for w in words}
+        return self._deck_words
+
+    def weakest_words(self, player, words, limit=10):
+        with self._connection() as conn:
+            by_word = self._use_deck(conn, words)
+            # Rows for words that have left the deck don't count
+            seen = conn.execute(
+                "SELECT COUNT(*) FROM word_scores JOIN temp.deck USING (word) WHERE player = ?",
+                (player,)).fetchone()[0]
+            if seen < len(by_word):
+                # Some deck words have never been asked; those always sort first
+                return _sort_weakest(words, self.get_word_scores(player), limit)
+
+            # Every deck word has a row: walk the (player, score) index from the bottom
+            rows = conn.execute(
+                "SELECT word FROM word_scores JOIN temp.deck USING (word) WHERE player = ? "
+                "ORDER BY score LIMIT ?", (player, limit)).fetchall()
+        return [by_word[word] for (word,) in rows]
+
+    def get_reviews(self, player):
+        with self._connection() as conn:
+            rows = conn.execute("SELECT word, box, due FROM reviews WHERE player = ?", (player,)).fetchall()
+        return {word: (box, due) for word, box, due in rows}
+
+    def set_review(self, player, word, box, due):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reviews (player, word, box, due) VALUES (?, ?, ?, ?)",
+                (player, word, box, due))
+
+    def get_schedule(self, player):
+        with self._connection() as conn:
+            row = conn.execute("SELECT mode FROM schedules WHERE player = ?", (player,)).fetchone()
+        return row[0] if row else DEFAULT_SCHEDULE
+
+    def set_schedule(self, player, mode):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO schedules (player, mode) VALUES (?, ?)", (player, mode))
+
+    def is_empty(self):
+        with self._connection() as conn:
+            return (conn.execute("SELECT 1 FROM player_scores LIMIT 1").fetchone() is None and
+                    conn.execute("SELECT 1 FROM word_scores LIMIT 1").fetchone() is None)
+
+    def get_meta(self, key, default=None):
+        with self._connection() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, str(value)))
+
+    def write_batch(self, totals, word_rows, review_rows=(), schedule_rows=()):
+        """Set absolute values in one transaction: totals are (player, game_type, score), word_rows
+        (player, word, score), review_rows (player, word, box, due) and schedule_rows (player, mode)."""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO player_scores (player, game_type, score) VALUES (?, ?, ?)",
+                    totals)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO word_scores (player, word, score) VALUES (?, ?, ?)",
+                    word_rows)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO reviews (player, word, box, due) VALUES (?, ?, ?, ?)",
+                    review_rows)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO schedules (player, mode) VALUES (?, ?)", schedule_rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def import_data(self, data):
+        """Bulk-load a scores.json style dict in a single transaction."""
+        totals = [(player, 'words', score) for player, score in data.items()
+                  if player not in RESERVED_KEYS]
+        totals += [(player, 'math', score) for player, score in data.get('math_scores', {}).items()]
+        word_rows = [(player, word, score)
+                     for player, user_scores in data.get('word_scores', {}).items()
+                     for word, score in user_scores.items()]
+        review_rows = [(player, word, box, due)
+                       for player, user_reviews in data.get('reviews', {}).items()
+                       for word, (box, due) in user_reviews.items()]
+        self.write_batch(totals, word_rows, review_rows, data.get('schedules', {}).items())
+
+    def export(self):
+        """Return the full score data in the scores.json layout."""
+        data = {key: {} for key in RESERVED_KEYS}
+        with self._connection() as conn:
+            for player, game_type, score in conn.execute(
+                    "SELECT player, game_type, score FROM player_scores"):
+                if game_type == 'math':
+                    data['math_scores'][player] = score
+                else:
+                    data[player] = score
+            for player, word, score in conn.execute("SELECT player, word, score FROM word_scores"):
+                data['word_scores'].setdefault(player, {})[word] = score
+            for player, word, box, due in conn.execute("SELECT player, word, box, due FROM reviews"):
+                data['reviews'].setdefault(player, {})[word] = [box, due]
+            data['schedules'] = dict(conn.execute("SELECT player, mode FROM schedules"))
+        return data
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _MemoryScoreStore:
+    """Score state held in memory. Subclasses persist it through `_changed`.
+
+    Every mutation is expressed as a compact change record:
+        {'k': kind, 'p': player, 'g': game_type, 'd': points, 'w': word (optional)}
+    where kind is 'text', 'mc' or 'math' for graded answers, 'adjust' for
+    direct score changes and 'join' for a new zero entry. Scheduling state
+    uses {'k': 'review', 'p', 'w', 'b': box, 'u': due} and
+    {'k': 'schedule', 'p', 'm': mode}.
+
+    Locking is striped per player: a player's updates always take the same
+    one of `stripes` locks, so they are linearizable, while different players
+    almost never contend. The shared dicts are only touched with single
+    operations on that player's key, which the GIL keeps atomic. Whole-state
+    operations (export, flush, compaction) take every stripe in order.
+    """
+
+    def __init__(self, stripes=LOCK_STRIPES):
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._totals = {'words': {}, 'math': {}}
+        self._word_scores = {}
+        self._reviews = {}
+        self._schedules = {}
+
+    def _load_state(self, data):
+        self._totals = {
+            'words': {player: score for player, score in data.items() if player not in RESERVED_KEYS},
+            'math': dict(data.get('math_scores', {})),
+        }
+        self._word_scores = {player: dict(user_scores)
+                             for player, user_scores in data.get('word_scores', {}).items()}
+        self._reviews = {player: {word: tuple(state) for word, state in user_reviews.items()}
+                         for player, user_reviews in data.get('reviews', {}).items()}
+        self._schedules = dict(data.get('schedules', {}))
+
+    def _apply(self, record):
+        """Apply a change record to the in-memory state. Returns the new total."""
+        if record['k'] == 'review':
+            self._reviews.setdefault(record['p'], {})[record['w']] = (record['b'], record['u'])
+            return None
+        if record['k'] == 'schedule':
+            self._schedules[record['p']] = record['m']
+            return None
+        player, game_type, points = record['p'], record['g'], record['d']
+        totals = self._totals[game_type]
+        if _is_history_only(record):
+            return totals.get(player, 0)
+        word = record.get('w')
+        if word is not None:
+            user_scores = self._word_scores.setdefault(player, {})
+            user_scores[word] = user_scores.get(word, 0) + points
+        totals[player] = totals.get(player, 0) + points
+        return totals[player]
+
+    def _lock_for(self, player):
+        return self._stripes[hash(player) % len(self._stripes)]
+
+    @contextmanager
+    def _all_locks(self):
+        for lock in self._stripes:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._stripes):
+                lock.release()
+
+    def _change(self, record):
+        with self._lock_for(record['p']):
+            total = self._apply(record)
+            self._changed(record)
+            return total
+
+    def _changed(self, record):
+        """Called with the player's lock held after `record` has been applied."""
+        raise NotImplementedError
+
+    def get_score(self, player, game_type='words'):
+        with self._lock_for(player):
+            return self._totals[game_type].get(player, 0)
+
+    def ensure_player(self, player, game_type='words'):
+        with self._lock_for(player):
+            totals = self._totals[game_type]
+            if player in totals:
+                return totals[player]
+            record = {'k': 'join', 'p': player, 'g': game_type, 'd': 0}
+            self._apply(record)
+            self._changed(record)
+            return totals[player]
+
+    def add_score(self, player, points, game_type='words'):
+        return self._change({'k': 'adjust', 'p': player, 'g': game_type, 'd': points})
+
+    def get_word_scores(self, player):
+        with self._lock_for(player):
+            return dict(self._word_scores.get(player, {}))
+
+    def add_word_points(self, player, word, points):
+        return self._change({'k': 'adjust', 'p': player, 'g': 'words', 'd': points, 'w': word})
+
+    def record_answer(self, player, kind, points, word=None):
+        record = {'k': kind, 'p': player, 'g': 'math' if kind == 'math' else 'words', 'd': points}
+        if word is not None:
+            record['w'] = word
+        return self._change(record)
+
+    def weakest_words(self, player, words, limit=10):
+        return _sort_weakest(words, self.get_word_scores(player), limit)
+
+    def get_reviews(self, player):
+        with self._lock_for(player):
+            return dict(self._reviews.get(player, {}))
+
+    def set_review(self, player, word, box, due):
+        self._change({'k': 'review', 'p': player, 'w': word, 'b': box, 'u': due})
+
+    def get_schedule(self, player):
+        return self._schedules.get(player, DEFAULT_SCHEDULE)
+
+    def set_schedule(self, player, mode):
+        self._change({'k': 'schedule', 'p': player, 'm': mode})
+
+    def export(self):
+        """Return the full score data in the scores.json layout."""
+        with self._all_locks():
+            return self._export_locked()
+
+    def _export_locked(self):
+        data = dict(self._totals['words'])
+        data['math_scores'] = dict(self._totals['math'])
+        data['word_scores'] = {player: dict(user_scores)
+                               for player, user_scores in self._word_scores.items()}
+        data['reviews'] = {player: {word: list(state) for word, state in user_reviews.items()}
+                           for player, user_reviews in self._reviews.items()}
+        data['schedules'] = dict(self._schedules)
+        return data
+
+
+class _Dirty:
+    """What a CachedScoreStore still has to write for one player."""
+    __slots__ = ('game_types', 'words', 'reviews', 'schedule')
+
+    def __init__(self):
+        self.game_types = set()
+        self.words = set()
+        self.reviews = set()
+        self.schedule = False
+
+    def merge(self, other):
+        self.game_types |= other.game_types
+        self.words |= other.words
+        self.reviews |= other.reviews
+        self.schedule = self.schedule or other.schedule
+
+
+class CachedScoreStore(_MemoryScoreStore):
+    """Write-behind cache in front of a JsonScoreStore or SqliteScoreStore.
+
+    The full score state is loaded once and every read is served from memory.
+    Mutations mark the player dirty; a background thread writes all dirty
+    entries to the backend in one batch every `flush_interval` seconds, or
+    sooner once `max_dirty` players are waiting. Up to `flush_interval`
+    seconds of answers can be lost on a hard crash; close() flushes the rest.
+    """
+
+    def __init__(self, backend, flush_interval=2.0, max_dirty=100, stripes=LOCK_STRIPES):
+        super().__init__(stripes)
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_dirty = max_dirty
+        self.flush_count = 0
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._load_state(backend.export())
+        # player -> _Dirty; repeated updates coalesce here
+        self._dirty = {}
+
+        self._thread = threading.Thread(target=self._run, name='score-flusher', daemon=True)
+        self._thread.start()
+
+    def _changed(self, record):
+        if _is_history_only(record):
+            return
+        dirty = self._dirty.get(record['p'])
+        if dirty is None:
+            dirty = self._dirty[record['p']] = _Dirty()
+        if record['k'] == 'review':
+            dirty.reviews.add(record['w'])
+        elif record['k'] == 'schedule':
+            dirty.schedule = True
+        else:
+            dirty.game_types.add(record['g'])
+            if record.get('w') is not None:
+                dirty.words.add(record['w'])
+        if len(self._dirty) >= self.max_dirty:
+            self._wakeup.set()
+
+    def pending(self):
+        """Number of players with changes not yet written to the backend."""
+        return len(self._dirty)
+
+    def flush(self):
+        """Write every dirty entry to the backend in one batch. Returns players written."""
+        with self._flush_lock:
+            with self._all_locks():
+                if not self._dirty:
+                    return 0
+                dirty, self._dirty = self._dirty, {}
+                totals = [(player, game_type, self._totals[game_type].get(player, 0))
+                          for player, entry in dirty.items()
+                          for game_type in entry.game_types]
+                word_rows = [(player, word, self._word_scores[player][word])
+                             for player, entry in dirty.items()
+                             for word in entry.words]
+                review_rows = [(player, word) + tuple(self._reviews[player][word])
+                               for player, entry in dirty.items()
+                               for word in entry.reviews]
+                schedule_rows = [(player, self._schedules[player])
+                                 for player, entry in dirty.items() if entry.schedule]
+            try:
+                self.backend.write_batch(totals, word_rows, review_rows, schedule_rows)
+            except Exception as e:
+                print(f"Warning: score flush failed, will retry: {e}")
+                with self._all_locks():
+                    for player, entry in dirty.items():
+                        self._dirty.setdefault(player, _Dirty()).merge(entry)
+                return 0
+            self.flush_count += 1
+            return len(dirty)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flusher, write any remaining changes and close the backend."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+        self.backend.close()
+
+
+def _journal_segments(journal_path):
+    """Archived journal segments as (last_seq, path), oldest first."""
+    directory = os.path.dirname(os.path.abspath(journal_path))
+    prefix = os.path.basename(journal_path) + '.'
+    segments = []
+    for name in os.listdir(directory):
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and suffix.isdigit():
+            segments.append((int(suffix), os.path.join(directory, name)))
+    return sorted(segments)
+
+
+def iter_journal(journal_path, after_seq=0):
+    """Yield journal records with seq > `after_seq`, oldest first, across archived segments.
+
+    A torn final line from a crash mid-append is skipped.
+    """
+    paths = [path for last_seq, path in _journal_segments(journal_path) if last_seq > after_seq]
+    if os.path.exists(journal_path):
+        paths.append(journal_path)
+    for path in paths:
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('s', 0) > after_seq:
+                    yield record
+
+
+class JournalScoreStore(_MemoryScoreStore):
+    """Scores persisted as a snapshot plus an append-only journal of change records.
+
+    Each graded answer is one appended line, so a write costs O(1) regardless
+    of how many players exist. A compactor thread periodically folds the
+    journal into the snapshot: it rotates the live journal to an archived
+    segment named by its last sequence number (kept as replayable history)
+    and atomically rewrites the snapshot. Startup loads the snapshot and
+    replays every record newer than it.
+    """
+
+    def __init__(self, snapshot_path, journal_path, seed_path=None,
+                 compact_every=1000, compact_interval=300, stripes=LOCK_STRIPES):
+        super().__init__(stripes)
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        self.compaction_count = 0
+        self._journal_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        seq = 0
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            seq = snapshot['seq']
+            self._load_state(snapshot['scores'])
+        elif seed_path and os.path.exists(seed_path):
+            with open(seed_path, "r") as f:
+                self._load_state(json.load(f))
+            print(f"Seeded score journal from {seed_path}")
+
+        replayed = 0
+        for record in iter_journal(journal_path, after_seq=seq):
+            self._apply(record)
+            seq = record['s']
+            replayed += 1
+        self._seq = seq
+        self._since_compact = replayed
+        self._journal = open(journal_path, "a")
+
+        self._thread = threading.Thread(target=self._run, name='score-compactor', daemon=True)
+        self._thread.start()
+
+    def _changed(self, record):
+        # Appends from different players' stripes are ordered by the journal lock
+        with self._journal_lock:
+            self._seq += 1
+            line = {'s': self._seq, 't': round(time.time(), 3), **record}
+            self._journal.write(json.dumps(line, separators=(',', ':')) + '\n')
+            self._journal.flush()
+            self._since_compact += 1
+            if self._since_compact >= self.compact_every:
+                self._wakeup.set()
+
+    def compact(self):
+        """Fold the journal into a new snapshot. Returns the snapshot sequence number."""
+        with self._compact_lock:
+            with self._all_locks(), self._journal_lock:
+                if self._since_compact == 0:
+                    return self._seq
+                seq = self._seq
+                data = self._export_locked()
+                # Rotate under the lock so every record <= seq is in an archived segment
+                self._journal.close()
+                if os.path.exists(self.journal_path):
+                    os.replace(self.journal_path, f"{self.journal_path}.{seq:012d}")
+                self._journal = open(self.journal_path, "a")
+                self._since_compact = 0
+
+            # Written outside the lock; until the rename lands, startup replays the archive
+            directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+            fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({'seq': seq, 'scores': data}, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.snapshot_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self.compaction_count += 1
+            return seq
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.compact_interval)
+            self._wakeup.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Warning: journal compaction failed: {e}")
+
+    def close(self):
+        """Stop the compactor, fold the remaining journal and close it."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.compact()
+        with self._journal_lock:
+            self._journal.close()
+
+
+def migrate_json_scores(json_path, store):
+    """One-shot import of an existing scores.json into a SqliteScoreStore.
+
+    Runs only while the database is empty and has not been migrated before.
+    Returns True if data was imported.
+    """
+    if store.get_meta('migrated_from_json'):
+        return False
+    if not os.path.exists(json_path) or not store.is_empty():
+        store.set_meta('migrated_from_json', 'skipped')
+        return False
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    store.import_data(data)
+    store.set_meta('migrated_from_json', json_path)
+    return True
+
+
+def open_score_store(backend, json_path, db_path, flush_interval=0, max_dirty=100,
+                     journal_path=None, snapshot_path=None, compact_every=1000):
+    """Create the score store for `backend` ('json', 'sqlite' or 'journal').
+
+    A positive `flush_interval` puts a write-behind CachedScoreStore in front
+    of the json or sqlite backend; 0 writes every change through immediately.
+    The journal backend is seeded from `json_path` on first start.
+    """
+    if backend == 'journal':
+        return JournalScoreStore(snapshot_path, journal_path, seed_path=json_path,
+                                 compact_every=compact_every)
+    if backend == 'json':
+        store = JsonScoreStore(json_path)
+    elif backend == 'sqlite':
+        store = SqliteScoreStore(db_path)
+        if migrate_json_scores(json_path, store):
+            print(f"Migrated scores from {json_path} to {db_path}")
+    else:
+        raise ValueError(f"Unknown score backend: {backend}")
+    if flush_interval > 0:
+        return CachedScoreStore(store, flush_interval, max_dirty)
+    return store
@@ -0,0 +1,127 @@
+"""
+Resized copies of the images under assets/.
+
+download_cat_images.py saves search results at whatever size they come in,
+often several megabytes, and the cat card shows them about 300 pixels wide.
+Thumbnailer makes WebP or JPEG copies at a few fixed widths and keeps them
+on disk. Each copy is named by a hash of the source bytes plus the width,
+so it is made once and never goes stale. The name doubles as the ETag.
+
+Resizing needs Pillow. Without it, `available` is False and callers should
+serve the original file.
+"""
+
+import hashlib
+import os
+import threading
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+FORMATS = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+
+def file_version(st):
+    """A short token that changes whenever the file behind os.stat result `st` is rewritten."""
+    return f'{st.st_mtime_ns:x}{st.st_size:x}'
+
+
+class Thumbnailer:
+    """Width-limited WebP/JPEG copies of images under `root`, cached in `cache_dir`.
+
+    Requested widths are rounded up to the next of `widths` (or down to the
+    largest) so the cache holds a handful of sizes per image. Images are
+    never enlarged.
+    """
+
+    def __init__(self, root='assets', cache_dir='thumbnail_cache', widths=(160, 320, 480, 640, 960), quality=80):
+        self.root = os.path.realpath(root)
+        self.cache_dir = cache_dir
+        self.widths = tuple(sorted(widths))
+        self.quality = quality
+        self.available = Image is not None
+        self.formats = ('webp', 'jpeg') if self.available and features.check('webp') else ('jpeg',)
+        self._hashes = {}  # source path -> (mtime_ns, size, sha256 hex)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.generated = 0
+        self.errors = 0
+        self.source_bytes = 0
+        self.output_bytes = 0
+
+    def source(self, filename):
+        """The absolute path of `filename` under the root, or None if it is outside it or missing."""
+        path = os.path.realpath(os.path.join(self.root, filename))
+        if os.path.commonpath((self.root, path)) != self.root or not os.path.isfile(path):
+            return None
+        return path
+
+    def width_for(self, width):
+        for allowed in self.widths:
+            if allowed >= width:
+                return allowed
+        return self.widths[-1]
+
+    def pick_format(self, accepts_webp):
+        return 'webp' if accepts_webp and 'webp' in self.formats else 'jpeg'
+
+    def _source_hash(self, path, st):
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+        with self._lock:
+            self._hashes[path] = (st.st_mtime_ns, st.st_size, digest.hexdigest())
+        return digest.hexdigest()
+
+    def derivative(self, path, width, fmt):
+        """(cache path, ETag) of `path` (from source()) resized to `width` in `fmt`, made now if not cached."""
+        st = os.stat(path)
+        key = f'{self._source_hash(path, st)[:24]}-{self.width_for(width)}'
+        cached = os.path.join(self.cache_dir, f'{key}.{fmt}')
+        if os.path.exists(cached):
+            with self._lock:
+                self.hits += 1
+            return cached, f'{key}-{fmt}'
+        temp = f'{cached}.{threading.get_ident()}.tmp'
+        try:
+            with Image.open(path) as image:
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((self.width_for(width), image.height))  # Keeps the aspect ratio, never enlarges
+                if fmt == 'jpeg':
+                    image = image.convert('RGB')
+                elif image.mode not in ('RGB', 'RGBA'):
+                    transparent = 'A' in image.getbands() or 'transparency' in image.info
+                    image = image.convert('RGBA' if transparent else 'RGB')
+                os.makedirs(self.cache_dir, exist_ok=True)
+                image.save(temp, fmt.upper(), quality=self.quality)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        os.replace(temp, cached)  # Readers only ever see complete files
+        with self._lock:
+            self.generated += 1
+            self.source_bytes += st.st_size
+            self.output_bytes += os.path.getsize(cached)
+        return cached, f'{key}-{fmt}'
+
+    def stats(self):
+        with self._lock:
+            return {
+                'available': self.available,
+                'formats': list(self.formats),
+                'widths': list(self.widths),
+                'hits': self.hits,
+                'generated': self.generated,
+                'errors': self.errors,
+                'size_ratio': self.output_bytes / self.source_bytes if self.source_bytes else None,
+            }
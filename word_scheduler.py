@@ -0,0 +1,240 @@
+"""
+Incremental word scheduling.
+
+get_next_word used to sort the whole deck by the player's word scores on
+every question just to take the 10 weakest. WordScheduler keeps a min-heap
+per player instead, built once from the stored scores and updated as answers
+are scored, so each question costs O(limit log n).
+
+Players can also switch to spaced repetition with Leitner boxes: every word
+they answer gets a box and a due time, kept in a second heap ordered by due
+time. Words that are due come first; when nothing is due the weakest-words
+policy picks the next word from those without a box. Boxed words leave the
+weakest heap in this mode (the due heap brings them back when due), so
+picking never wades through words scheduled for later.
+"""
+
+import collections
+import heapq
+import random
+import threading
+import time
+
+_UNSEEN = float('-inf')  # Never-answered words sort ahead of every score
+
+# Seconds until a word in box N is due again
+LEITNER_INTERVALS = (30, 5 * 60, 30 * 60, 4 * 3600, 86400, 3 * 86400, 7 * 86400, 21 * 86400)
+
+
+def leitner_step(box, outcome, now, intervals=LEITNER_INTERVALS):
+    """Next (box, due) after an answer.
+
+    'correct' (free text) moves the word up a box, 'partial' (multiple choice
+    after a miss) keeps it in its box, 'wrong' sends it back to box 0. A word
+    with no box yet (None) starts in box 0.
+    """
+    if box is None or outcome == 'wrong':
+        box = 1 if outcome == 'correct' else 0
+    elif outcome == 'correct':
+        box = min(box + 1, len(intervals) - 1)
+    return box, now + intervals[box]
+
+
+class _PlayerQueue:
+    __slots__ = ('keys', 'heap', 'schedule', 'reviews', 'due_heap', 'lock')
+
+    def __init__(self, keys, schedule, reviews):
+        self.keys = keys  # deck index -> current sort key
+        self.schedule = schedule
+        self.reviews = reviews  # deck index -> (box, due)
+        self.fill_heap()
+        self.due_heap = [(due, index) for index, (box, due) in reviews.items()]
+        heapq.heapify(self.due_heap)
+        self.lock = threading.Lock()
+
+    def boxed(self, index):
+        """Whether deck entry `index` is left to the due heap rather than the weakest heap."""
+        return self.schedule == 'leitner' and index in self.reviews
+
+    def fill_heap(self):
+        self.heap = [(key, index) for index, key in enumerate(self.keys) if not self.boxed(index)]
+        heapq.heapify(self.heap)
+
+
+class WordScheduler:
+    """Per-player word selection over a fixed deck, backed by the score store.
+
+    The weakest-words order matches the legacy sort: never-answered words
+    first, then lowest score, ties in deck order. Heap entries are never
+    updated in place; a change pushes a new entry and stale ones are skipped
+    (and dropped) when they surface. A player's queue is built from the store
+    on first use; at most `max_players` queues are kept, and the least
+    recently used one is rebuilt on demand.
+
+    Each queue holds a few entries per deck word, so with a large deck the
+    player count alone doesn't bound memory: queues are also evicted while
+    more than `max_entries` deck words' worth are cached (one queue is always
+    kept).
+    """
+
+    def __init__(self, deck, store, max_players=256, max_entries=2_000_000):
+        self.deck = deck
+        self.store = store
+        self.max_players = max_players
+        self.max_entries = max_entries
+        self._positions = collections.defaultdict(list)  # word -> deck indexes
+        for index, word_info in enumerate(deck):
+            self._positions[word_info['word']].append(index)
+        self._queues = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def _queue(self, player):
+        with self._lock:
+            queue = self._queues.get(player)
+            if queue is not None:
+                self._queues.move_to_end(player)
+                return queue
+        scores = self.store.get_word_scores(player)
+        reviews = {}
+        for word, state in self.store.get_reviews(player).items():
+            for index in self._positions.get(word, ()):
+                reviews[index] = tuple(state)
+        queue = _PlayerQueue([scores.get(word_info['word'], _UNSEEN) for word_info in self.deck],
+                             self.store.get_schedule(player), reviews)
+        with self._lock:
+            # Another thread may have built the same player meanwhile; keep the first
+            queue = self._queues.setdefault(player, queue)
+            self._queues.move_to_end(player)
+            self.builds += 1
+            while len(self._queues) > 1 and (len(self._queues) > self.max_players or
+                                             len(self._queues) * len(self.deck) > self.max_entries):
+                self._queues.popitem(last=False)
+        return queue
+
+    @staticmethod
+    def _pop_valid(queue, limit):
+        """Pop up to `limit` current weakest entries and push them back."""
+        taken = []
+        taken_indexes = set()
+        while queue.heap and len(taken) < limit:
+            key, index = heapq.heappop(queue.heap)
+            if key != queue.keys[index] or index in taken_indexes or queue.boxed(index):
+                continue  # Stale entry left behind by a score change, or a word that got a box
+            taken.append((key, index))
+            taken_indexes.add(index)
+        for entry in taken:
+            heapq.heappush(queue.heap, entry)
+        return [index for _, index in taken]
+
+    def weakest(self, player, limit=10):
+        """The `limit` weakest deck entries for `player`, weakest first."""
+        queue = self._queue(player)
+        with queue.lock:
+            return [self.deck[index] for index in self._pop_valid(queue, limit)]
+
+    @staticmethod
+    def _pop_due(queue, count, until):
+        """Pop up to `count` current entries due by `until`, earliest first, and push them back."""
+        taken = []
+        taken_indexes = set()
+        while queue.due_heap and len(taken) < count:
+            due, index = queue.due_heap[0]
+            if due > until and queue.reviews.get(index, (None, None))[1] == due:
+                break
+            heapq.heappop(queue.due_heap)
+            if queue.reviews.get(index, (None, None))[1] != due or index in taken_indexes:
+                continue  # Stale entry left behind by a review
+            taken.append((due, index))
+            taken_indexes.add(index)
+        for entry in taken:
+            heapq.heappush(queue.due_heap, entry)
+        return [index for _, index in taken]
+
+    def upcoming(self, player, count=1, limit=10, now=None, rng=random):
+        """The next `count` distinct words to ask `player`, in order.
+
+        Weakest mode: a random pick from the max(limit, count) weakest words.
+        Leitner mode: due words first, most overdue first, then a random pick
+        from the weakest words that have no box yet; if every word has a box
+        and none is due, the word due soonest.
+        """
+        queue = self._queue(player)
+        with queue.lock:
+            if queue.schedule != 'leitner':
+                pool = self._pop_valid(queue, max(limit, count))
+                return [self.deck[index] for index in rng.sample(pool, min(count, len(pool)))]
+            now = time.time() if now is None else now
+            chosen = self._pop_due(queue, count, now)
+            if len(chosen) < count:
+                # Every due word is chosen already, and the weakest heap holds only unboxed words
+                pool = self._pop_valid(queue, max(limit, count))
+                chosen += rng.sample(pool, min(count - len(chosen), len(pool)))
+            if not chosen:
+                chosen = self._pop_due(queue, 1, float('inf'))
+            return [self.deck[index] for index in chosen]
+
+    def record(self, player, word, points, outcome=None, now=None):
+        """Apply an answer whose points are already written to the score store.
+
+        `outcome` ('correct', 'partial' or 'wrong') advances the word's
+        Leitner box for players in that mode; the new review state is written
+        to the store. Players without a queue only get the review update;
+        their next build reads everything else from the store.
+        """
+        with self._lock:
+            queue = self._queues.get(player)
+        if queue is None:
+            if outcome is not None and self.store.get_schedule(player) == 'leitner':
+                box, _ = self.store.get_reviews(player).get(word, (None, None))
+                self.store.set_review(player, word, *leitner_step(box, outcome, time.time() if now is None else now))
+            return
+        with queue.lock:
+            for index in self._positions.get(word, ()):
+                key = queue.keys[index]
+                key = (0 if key == _UNSEEN else key) + points
+                queue.keys[index] = key
+                heapq.heappush(queue.heap, (key, index))
+            if len(queue.heap) > 2 * len(queue.keys) + 64:
+                queue.fill_heap()
+            if outcome is None or queue.schedule != 'leitner' or word not in self._positions:
+                return
+            index = self._positions[word][0]
+            box, due = leitner_step(queue.reviews.get(index, (None, None))[0], outcome,
+                                    time.time() if now is None else now)
+            for index in self._positions[word]:
+                queue.reviews[index] = (box, due)
+                heapq.heappush(queue.due_heap, (due, index))
+            if len(queue.due_heap) > 2 * len(queue.reviews) + 64:
+                queue.due_heap = [(due, index) for index, (box, due) in queue.reviews.items()]
+                heapq.heapify(queue.due_heap)
+        self.store.set_review(player, word, box, due)
+
+    def get_schedule(self, player):
+        """`player`'s schedule mode, without building their queue if it isn't cached."""
+        with self._lock:
+            queue = self._queues.get(player)
+        return queue.schedule if queue is not None else self.store.get_schedule(player)
+
+    def set_schedule(self, player, mode):
+        """Switch `player` between 'weakest' and 'leitner' and persist the choice."""
+        self.store.set_schedule(player, mode)
+        with self._lock:
+            queue = self._queues.get(player)
+        if queue is not None:
+            with queue.lock:
+                if queue.schedule != mode:
+                    queue.schedule = mode
+                    queue.fill_heap()  # Boxed words leave or rejoin the weakest heap
+
+    def stats(self):
+        with self._lock:
+            return {
+                'deck': len(self.deck),
+                'players': len(self._queues),
+                'leitner_players': sum(1 for queue in self._queues.values() if queue.schedule == 'leitner'),
+                'max_players': self.max_players,
+                'entries': len(self._queues) * len(self.deck),
+                'max_entries': self.max_entries,
+                'builds': self.builds,
+            }